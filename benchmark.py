@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成流程的性能测试
+用synthetic_dictionary生成不同规模的合成词典，分阶段计时ThemesSQLGenerator.run和generate_sql()，
+结果写入JSON；与基准文件比较，任一阶段吞吐量低于基准（扣除容差）时以非零状态退出。
+
+python benchmark.py --sizes 10000 100000
+python benchmark.py --sizes 10000 --update-baseline
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BASELINE_FILE = 'benchmark_baseline.json'
+RESULTS_FILE = 'benchmark_results.json'
+
+# 基准耗时短于此值的阶段计时误差太大，不参与比较
+MIN_STAGE_SECONDS = 0.01
+
+# 基准文件、合成词典等都相对于本脚本所在目录
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class StageTimer:
+    """记录每个阶段的耗时和吞吐量（行/秒）"""
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.stages = {}
+
+    def run(self, name: str, func: Callable, *args, **kwargs):
+        # 生成脚本的进度输出在计时期间屏蔽
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+        self.stages[name] = {
+            'seconds': round(elapsed, 6),
+            'rows_per_second': round(self.rows / elapsed, 1) if elapsed > 0 else None,
+        }
+        return result
+
+
+def benchmark_themes(csv_file: str, rows: int) -> Dict:
+    """分阶段计时themes生成：load, extract, build, count, sql, report，以及完整的run"""
+    from dictionary_cache import clear_cache
+    from generate_themes_sql import ThemesSQLGenerator
+
+    timer = StageTimer(rows)
+    clear_cache(csv_file)
+    generator = ThemesSQLGenerator(csv_file)
+    df = timer.run('load', generator.load_data)
+    categories = timer.run('extract', generator.extract_unique_categories, df)
+    timer.run('build', generator.build_themes_structure, *categories)
+    theme_counts = timer.run('count', generator.count_expressions_by_theme, df)
+    subtree_counts = timer.run('count_subtree', generator.count_subtree_expressions, df)
+    timer.run('sql', lambda: generator.generate_sql() + generator.generate_update_counts_sql(theme_counts, subtree_counts))
+    timer.run('report', generator.generate_report, *categories)
+
+    clear_cache(csv_file)
+    timer.run('run', ThemesSQLGenerator(csv_file).run)
+    return timer.stages
+
+
+def benchmark_expressions(csv_file: str, rows: int) -> Dict:
+    """分阶段计时expressions生成：read, transform, write_parts, report，以及完整的generate_sql()"""
+    from dictionary_cache import clear_cache, load_columns, iter_records
+    from jyutping import clear_jyutping_cache
+    import generate_expressions_sql as expressions
+
+    timer = StageTimer(rows)
+    theme_mapping = expressions.load_theme_mapping()
+    clear_cache(csv_file)
+    clear_jyutping_cache()
+    columns = timer.run('read', load_columns, csv_file)
+
+    category_stats = {}
+    generated_at = datetime.now().isoformat(sep=' ', timespec='seconds')
+    items = timer.run('transform', lambda: [
+        expressions.format_item(record, 'sql', generated_at)
+        for record in expressions.iter_expression_records(iter_records(columns), theme_mapping, category_stats)
+    ])
+    record_count = timer.run('write_parts', expressions.write_sql_parts, [item[0] for item in items])
+    timer.run('report', expressions.write_report, record_count, category_stats)
+
+    clear_cache(csv_file)
+    clear_jyutping_cache()
+    timer.run('generate_sql', expressions.generate_sql, csv_file)
+    return timer.stages
+
+
+def best_of(runs: List[Dict]) -> Dict:
+    """多次运行中每个阶段取最短耗时，减少计时噪声"""
+    best = {}
+    for stages in runs:
+        for name, stage in stages.items():
+            if name not in best or stage['seconds'] < best[name]['seconds']:
+                best[name] = stage
+    return best
+
+
+def run_benchmarks(sizes: List[int], seed: int = 0, repeat: int = 3) -> Dict:
+    """在临时目录中逐个规模生成合成词典并计时，每个规模重复repeat次取最好成绩"""
+    from synthetic_dictionary import write_synthetic_csv
+
+    results = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'sizes': {},
+    }
+    cwd = os.getcwd()
+    for rows in sizes:
+        with tempfile.TemporaryDirectory(prefix='satgwong_bench_') as work_dir:
+            os.chdir(work_dir)
+            try:
+                csv_file = 'synthetic.csv'
+                start = time.perf_counter()
+                write_synthetic_csv(csv_file, rows, seed)
+                print(f"[{rows}] 合成词典已生成 ({time.perf_counter() - start:.1f} 秒)")
+                themes = best_of([benchmark_themes(csv_file, rows) for _ in range(repeat)])
+                expressions = best_of([benchmark_expressions(csv_file, rows) for _ in range(repeat)])
+            finally:
+                os.chdir(cwd)
+        results['sizes'][str(rows)] = {'themes': themes, 'expressions': expressions}
+        for group, stages in (('themes', themes), ('expressions', expressions)):
+            summary = ', '.join(f"{name} {stage['seconds']:.3f}s" for name, stage in stages.items())
+            print(f"[{rows}] {group}: {summary}")
+    return results
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """返回吞吐量低于基准*(1-tolerance)的阶段，基准中没有的规模和阶段不比较"""
+    regressions = []
+    for size, groups in results['sizes'].items():
+        for group, stages in groups.items():
+            for name, stage in stages.items():
+                expected_stage = baseline.get('sizes', {}).get(size, {}).get(group, {}).get(name)
+                if not expected_stage or expected_stage['seconds'] < MIN_STAGE_SECONDS:
+                    continue
+                expected = expected_stage['rows_per_second']
+                actual = stage['rows_per_second']
+                if expected and actual is not None and actual < expected * (1 - tolerance):
+                    regressions.append(f"{size} {group}.{name}: {actual:.0f} 行/秒 < 基准 {expected:.0f} 行/秒")
+    return regressions
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='生成流程的性能测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000],
+                        help='合成词典的行数，可指定多个（如 10000 100000 1000000 5000000）')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据的随机种子')
+    parser.add_argument('--repeat', type=int, default=3, help='每个规模重复运行的次数，取各阶段最短耗时')
+    parser.add_argument('--output', default=os.path.join(ROOT_DIR, RESULTS_FILE), help='结果JSON文件')
+    parser.add_argument('--baseline', default=os.path.join(ROOT_DIR, BASELINE_FILE), help='基准JSON文件')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='允许的吞吐量下降比例（默认0.3，即低于基准70%%时失败）')
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果更新基准文件')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT_DIR)
+    results = run_benchmarks(args.sizes, args.seed, args.repeat)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"测试结果已保存: {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"基准文件已更新: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"没有基准文件 {args.baseline}，跳过比较")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("吞吐量低于基准:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("所有阶段的吞吐量均不低于基准")
+
+
+if __name__ == '__main__':
+    main()
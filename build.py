@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+themes和expressions生成流程的统一构建入口
+各阶段组成依赖图：parse（解析CSV并写入缓存）→ theme_tree（登记主题ID）→ validate（校验数据，有错误时停止）
+→ theme_sql、expressions、snapshot，
+互不依赖的阶段在线程池中并发执行，CSV在同一进程内只解析一次。
+每个阶段的指纹由输入文件内容、所用源代码、参数和上游指纹计算，指纹未变且输出文件都在时跳过该阶段。
+任一阶段抛出异常（校验失败的ValueError、OSError、KeyError等）时不再提交新阶段，等待已开始的阶段结束后
+以BuildError报告失败的阶段和异常，命令行输出失败原因和已完成的阶段并以状态1退出；
+KeyboardInterrupt等非Exception的异常不被捕获，照常中断。
+pandas等较重的模块只在需要它们的阶段中导入。
+
+python build.py
+python build.py --format copy --compress gzip --jobs 4
+python build.py --force theme_sql
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, List, Optional
+
+from dictionary_cache import CACHE_DIR, cache_path_for, file_sha256
+
+BUILD_STATE_FILE = os.path.join(CACHE_DIR, 'build_state.json')
+BUILD_STATE_VERSION = 1
+
+
+class BuildError(Exception):
+    """某个阶段执行失败；stage为失败的阶段名，results为失败前已有结果的阶段 {阶段名: built / skipped}"""
+
+    def __init__(self, stage: str, error: Exception, results: Dict[str, str]):
+        super().__init__(f"阶段{stage}失败: {type(error).__name__}: {error}")
+        self.stage = stage
+        self.error = error
+        self.results = results
+
+
+class Stage:
+    def __init__(self, name: str, action: Callable[[], None], deps: Iterable[str] = (),
+                 inputs: Iterable[str] = (), outputs: Iterable[str] = (), code: Iterable[str] = (),
+                 params: Optional[Dict] = None):
+        """inputs和code中的文件内容、params及上游阶段的指纹共同决定本阶段的指纹"""
+        self.name = name
+        self.action = action
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+        self.params = params or {}
+
+
+class BuildState:
+    """记录各阶段上次成功时的指纹，以及文件哈希的缓存（按大小和修改时间复用）"""
+
+    def __init__(self, path: str = BUILD_STATE_FILE):
+        self.path = path
+        self.stages = {}  # {阶段名: 指纹}
+        self.files = {}  # {路径: [size, mtime_ns, sha256]}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == BUILD_STATE_VERSION:
+                self.stages = data['stages']
+                self.files = data['files']
+
+    def file_hash(self, path: str) -> str:
+        """文件内容的SHA-256，文件不存在时为空字符串"""
+        if not os.path.exists(path):
+            return ''
+        stat = os.stat(path)
+        with self._lock:
+            cached = self.files.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = file_sha256(path)
+        with self._lock:
+            self.files[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def record(self, stage: str, fingerprint: str) -> None:
+        with self._lock:
+            self.stages[stage] = fingerprint
+            self.save()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': BUILD_STATE_VERSION, 'stages': self.stages, 'files': self.files},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _log(message: str) -> None:
+    # 一次写出整行，并发阶段的输出不会在行内交错
+    sys.stdout.write(message + '\n')
+    sys.stdout.flush()
+
+
+def stage_fingerprint(stage: Stage, state: BuildState, dep_fingerprints: List[str]) -> str:
+    digest = hashlib.sha256()
+    digest.update(stage.name.encode('utf-8'))
+    digest.update(json.dumps(stage.params, sort_keys=True).encode('utf-8'))
+    for path in stage.inputs + stage.code:
+        digest.update(f"{path}:{state.file_hash(path)}".encode('utf-8'))
+    for fingerprint in dep_fingerprints:
+        digest.update(fingerprint.encode('ascii'))
+    return digest.hexdigest()
+
+
+def run_graph(stages: List[Stage], state: BuildState, jobs: int = 2,
+              force: Iterable[str] = ()) -> Dict[str, str]:
+    """按依赖顺序执行各阶段，返回每个阶段的结果: built / skipped
+
+    force中的阶段（及其下游，因为指纹随之变化）无条件重新执行；
+    阶段失败时抛出BuildError（原异常为其__cause__），依赖图有误时抛出ValueError
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"阶段{stage.name}依赖未知阶段: {dep}")
+    force = set(force)
+    pending = [stage.name for stage in stages]
+    fingerprints = {}
+    results = {}
+    running = {}
+
+    def execute(stage: Stage, fingerprint: str) -> str:
+        outputs_exist = all(os.path.exists(path) for path in stage.outputs)
+        if stage.name not in force and outputs_exist and state.stages.get(stage.name) == fingerprint:
+            _log(f"[{stage.name}] 输入未变化，跳过")
+            return 'skipped'
+        _log(f"[{stage.name}] 开始")
+        start = time.perf_counter()
+        stage.action()
+        state.record(stage.name, fingerprint)
+        _log(f"[{stage.name}] 完成 ({time.perf_counter() - start:.2f} 秒)")
+        return 'built'
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            # 提交所有上游已完成的阶段
+            for name in list(pending):
+                stage = by_name[name]
+                if all(dep in results for dep in stage.deps):
+                    pending.remove(name)
+                    fingerprint = stage_fingerprint(stage, state, [fingerprints[dep] for dep in stage.deps])
+                    if stage.name in force:
+                        fingerprint = hashlib.sha256(f"{fingerprint}:{time.time()}".encode('ascii')).hexdigest()
+                    fingerprints[name] = fingerprint
+                    running[executor.submit(execute, stage, fingerprint)] = name
+            if not running:
+                raise ValueError(f"依赖图中存在循环: {', '.join(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    # 等待已开始的阶段结束，不再提交新阶段
+                    pending.clear()
+                    wait(running)
+                    for other_future, other in running.items():
+                        if other_future.exception() is None:
+                            results[other] = other_future.result()
+                    raise BuildError(name, e, results) from e
+    return results
+
+
+def build_stages(csv_file: str = 'Satgwong_processed.csv', output_format: str = 'sql',
+                 compression: Optional[str] = None, workers: int = 1, batch_size: int = 1,
+                 snapshot: bool = True, upsert: bool = False, dedupe: bool = False,
+                 validate: bool = True) -> List[Stage]:
+    """生成流程的各阶段"""
+    from compressed_output import compressed_filename
+    from copy_export import (THEMES_COPY_FILE, THEME_CLOSURE_COPY_FILE, EXPRESSIONS_COPY_FILE,
+                             COPY_DRIVER_FILE, COPY_MANIFEST_FILE)
+    from sql_parts import PARTS_MANIFEST_FILE, load_part_files
+    from expression_tags import EXPRESSION_TAGS
+    from jyutping import EXPRESSION_PRONUNCIATIONS
+    from headword_variants import EXPRESSION_VARIANTS
+    from expression_themes import EXPRESSION_THEMES
+    from theme_registry import REGISTRY_FILE
+
+    def parse():
+        from dictionary_cache import load_columns
+        load_columns(csv_file)
+
+    def theme_tree():
+        # 增量SQL与themes_applied.json对比生成，该文件还不存在时以保存前的登记表为基准，因此在登记表保存的这一步写出；
+        # 增量SQL很小，不压缩，本阶段的指纹因此与压缩格式无关
+        from generate_themes_sql import ThemesSQLGenerator
+        generator = ThemesSQLGenerator(csv_file)
+        df = generator.load_data()
+        generator.build_themes_structure(*generator.extract_unique_categories(df))
+        closure_rows = generator.build_hierarchy()
+        if generator.registry.changed:
+            generator.registry.save()
+            print(f"主题登记表已更新: {generator.registry.path} (新增 {len(generator.registry.new_names)} 个主题)")
+        generator.write_delta_sql(closure_rows)
+
+    def validate_data():
+        from dictionary_validation import check_dictionary
+        check_dictionary(csv_file)
+
+    def theme_sql():
+        from generate_themes_sql import ThemesSQLGenerator
+        ThemesSQLGenerator(csv_file, output_format=output_format, compression=compression, write_delta=False).run()
+
+    def expressions():
+        from generate_expressions_sql import generate_sql
+        generate_sql(csv_file=csv_file, batch_size=batch_size, output_format=output_format,
+                     workers=workers, compression=compression, upsert=upsert, dedupe=dedupe)
+
+    def build_snapshot():
+        from dictionary_snapshot import build_snapshot as write_snapshot, SNAPSHOT_FILE
+        size = write_snapshot(csv_file, SNAPSHOT_FILE)
+        print(f"快照已生成: {SNAPSHOT_FILE} ({size} 字节)")
+
+    # 校验失败时抛出异常，下游阶段都不会执行
+    checked = ['validate'] if validate else ['theme_tree']
+    params = {'output_format': output_format, 'compression': compression}
+    side_tables = [EXPRESSION_TAGS, EXPRESSION_PRONUNCIATIONS, EXPRESSION_VARIANTS]
+    if dedupe:
+        side_tables.append(EXPRESSION_THEMES)
+    # 所有生成的文件都要列出，任一文件缺失时重新执行该阶段；
+    # themes_delta_insert.sql只在主题有新增或变动时存在，不作为theme_tree的输出
+    if output_format == 'copy':
+        theme_outputs = [compressed_filename(THEMES_COPY_FILE, compression),
+                         compressed_filename(THEME_CLOSURE_COPY_FILE, compression),
+                         COPY_DRIVER_FILE, COPY_MANIFEST_FILE]
+        expression_outputs = [compressed_filename(EXPRESSIONS_COPY_FILE, compression),
+                              COPY_DRIVER_FILE, COPY_MANIFEST_FILE]
+    else:
+        theme_outputs = [compressed_filename('themes_insert.sql', compression),
+                         compressed_filename('themes_hierarchy.sql', compression)]
+        # 分卷数随数据变化，取自上次生成的分卷清单
+        expression_outputs = [PARTS_MANIFEST_FILE] + load_part_files(PARTS_MANIFEST_FILE)
+    theme_outputs += ['themes_analysis_report.txt', 'themes_metrics.json']
+    expression_outputs += [table.output_file(output_format, compression) for table in side_tables]
+    expression_outputs += ['expressions_analysis_report.txt', 'expressions_metrics.json']
+
+    stages = [
+        Stage('parse', parse, inputs=[csv_file], outputs=[cache_path_for(csv_file)],
+              code=['dictionary_cache.py']),
+        # 登记表由本阶段写出，不作为本阶段的输入，否则每次运行后指纹都会变化；
+        # 下游阶段在本阶段完成后才计算指纹，登记表以写出后的内容计入
+        Stage('theme_tree', theme_tree, deps=['parse'], inputs=[csv_file],
+              outputs=[REGISTRY_FILE],
+              code=['generate_themes_sql.py', 'theme_registry.py']),
+    ]
+    if validate:
+        stages.append(Stage('validate', validate_data, deps=['theme_tree'], inputs=[csv_file, REGISTRY_FILE],
+                            outputs=['validation_report.json'],
+                            code=['dictionary_validation.py', 'jyutping.py', 'theme_registry.py']))
+    stages += [
+        Stage('theme_sql', theme_sql, deps=checked, inputs=[csv_file, REGISTRY_FILE],
+              outputs=theme_outputs, params=params,
+              code=['generate_themes_sql.py', 'theme_registry.py', 'copy_export.py', 'compressed_output.py',
+                    'instrumentation.py']),
+        Stage('expressions', expressions, deps=checked, inputs=[csv_file, REGISTRY_FILE],
+              outputs=expression_outputs, params=dict(params, batch_size=batch_size, upsert=upsert, dedupe=dedupe),
+              code=['generate_expressions_sql.py', 'theme_registry.py', 'expression_tags.py', 'jyutping.py',
+                    'expression_themes.py', 'headword_variants.py', 'side_tables.py', 'sql_parts.py',
+                    'copy_export.py', 'compressed_output.py', 'instrumentation.py']),
+    ]
+    if snapshot:
+        stages.append(Stage('snapshot', build_snapshot, deps=checked, inputs=[csv_file, REGISTRY_FILE],
+                            outputs=['satgwong.snapshot'],
+                            code=['dictionary_snapshot.py', 'dictionary_store.py', 'headword_variants.py',
+                                  'theme_registry.py']))
+    return stages
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='构建themes和expressions的全部输出，跳过输入未变化的阶段')
+    parser.add_argument('--csv', default='Satgwong_processed.csv', help='词典CSV文件')
+    parser.add_argument('--format', choices=['sql', 'copy'], default='sql',
+                        help='输出格式：sql为INSERT语句文件，copy为PostgreSQL COPY数据文件')
+    parser.add_argument('--compress', choices=['gzip', 'zstd'], default=None,
+                        help='边生成边压缩SQL和COPY文件（zstd需要安装zstandard）')
+    parser.add_argument('--batch-size', type=int, default=1, help='每条INSERT语句包含的行数')
+    parser.add_argument('--workers', type=int, default=1, help='expressions并行转换的进程数')
+    parser.add_argument('--jobs', type=int, default=2, help='同时执行的阶段数')
+    parser.add_argument('--upsert', action='store_true',
+                        help='expressions输出可重复导入的INSERT ... ON CONFLICT (id) DO UPDATE语句')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='合并重复词条，所属主题写入expression_themes关联表')
+    parser.add_argument('--no-validate', action='store_true', help='跳过数据校验')
+    parser.add_argument('--no-snapshot', action='store_true', help='不生成词典二进制快照')
+    parser.add_argument('--force', nargs='*', default=None, metavar='STAGE',
+                        help='强制重新执行指定阶段（不指定阶段名时为全部阶段）')
+    args = parser.parse_args()
+
+    stages = build_stages(args.csv, args.format, args.compress, args.workers, args.batch_size,
+                          snapshot=not args.no_snapshot, upsert=args.upsert, dedupe=args.dedupe,
+                          validate=not args.no_validate)
+    force = []
+    if args.force is not None:
+        force = args.force or [stage.name for stage in stages]
+    start = time.perf_counter()
+    try:
+        results = run_graph(stages, BuildState(), args.jobs, force)
+    except BuildError as e:
+        print(f"\n构建失败: {e}")
+        if e.results:
+            print(f"已完成的阶段: {', '.join(f'{name} ({result})' for name, result in e.results.items())}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"\n构建失败: {e}")
+        sys.exit(1)
+    built = [name for name, result in results.items() if result == 'built']
+    print(f"\n构建完成 ({time.perf_counter() - start:.2f} 秒): 执行 {len(built)} 个阶段, "
+          f"跳过 {len(results) - len(built)} 个阶段")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成文件的流式压缩与解压
+SQL分卷、themes_insert.sql、COPY数据文件等可以边生成边压缩为gzip或zstd（需要安装zstandard），
+不需要单独的压缩步骤；gzip头部的时间戳固定为0，相同内容的压缩文件逐字节相同。
+加载端可以直接把解压后的内容接到psql:
+python compressed_output.py expressions_insert_part*.sql.gz | psql -v ON_ERROR_STOP=1
+"""
+
+import gzip
+import io
+import shutil
+import sys
+from typing import BinaryIO, Optional, TextIO
+
+COMPRESSION_SUFFIXES = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+# 各格式的文件头，用于识别输入文件
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# 命令行解压程序（psql的\copy ... FROM PROGRAM使用）
+DECOMPRESS_COMMANDS = {
+    'gzip': 'gzip -dc',
+    'zstd': 'zstd -dc',
+}
+
+BUFFER_SIZE = 1024 * 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd压缩需要安装zstandard: pip install zstandard") from None
+    return zstandard
+
+
+def check_compression(compression: Optional[str]) -> None:
+    """检查压缩格式是否受支持（zstd需要可选依赖zstandard）"""
+    if compression is None:
+        return
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"未知的压缩格式: {compression}")
+    if compression == 'zstd':
+        _zstandard()
+
+
+def compressed_filename(filename: str, compression: Optional[str]) -> str:
+    """压缩输出的文件名，例如themes_insert.sql -> themes_insert.sql.gz"""
+    if compression is None:
+        return filename
+    return filename + COMPRESSION_SUFFIXES[compression]
+
+
+class _CompressedFile(io.RawIOBase):
+    """压缩写入的二进制文件，关闭时依次关闭压缩流和底层文件"""
+
+    def __init__(self, file: BinaryIO, stream):
+        self._file = file
+        self._stream = stream
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._stream.write(data)
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self._stream.close()
+            finally:
+                self._file.close()
+        super().close()
+
+
+def wrap_binary_output(file: BinaryIO, compression: Optional[str]) -> BinaryIO:
+    """在已打开的二进制文件上包一层压缩流，关闭返回值时同时关闭file"""
+    if compression is None:
+        return file
+    check_compression(compression)
+    if compression == 'gzip':
+        stream = gzip.GzipFile(fileobj=file, mode='wb', compresslevel=GZIP_LEVEL, mtime=0)
+    else:
+        stream = _zstandard().ZstdCompressor(level=ZSTD_LEVEL).stream_writer(file, closefd=False)
+    return io.BufferedWriter(_CompressedFile(file, stream), buffer_size=BUFFER_SIZE)
+
+
+def open_binary_output(filename: str, compression: Optional[str] = None) -> BinaryIO:
+    """打开二进制输出文件，filename应已包含压缩后缀"""
+    check_compression(compression)
+    return wrap_binary_output(open(filename, 'wb'), compression)
+
+
+def open_output(filename: str, compression: Optional[str] = None,
+                newline: Optional[str] = None) -> TextIO:
+    """打开UTF-8文本输出文件；compression为None时与open(filename, 'w', encoding='utf-8')相同"""
+    if compression is None:
+        return open(filename, 'w', encoding='utf-8', newline=newline)
+    return io.TextIOWrapper(open_binary_output(filename, compression), encoding='utf-8', newline=newline)
+
+
+def detect_compression(filename: str) -> Optional[str]:
+    """根据文件头识别压缩格式，未压缩时返回None"""
+    with open(filename, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if magic == ZSTD_MAGIC:
+        return 'zstd'
+    return None
+
+
+def open_input(filename: str) -> BinaryIO:
+    """以二进制流打开（可能已压缩的）输入文件，读取时边读边解压"""
+    compression = detect_compression(filename)
+    if compression == 'gzip':
+        return gzip.open(filename, 'rb')
+    if compression == 'zstd':
+        return _zstandard().ZstdDecompressor().stream_reader(open(filename, 'rb'), closefd=True)
+    return open(filename, 'rb')
+
+
+def open_text_input(filename: str) -> TextIO:
+    """以UTF-8文本流打开（可能已压缩的）输入文件"""
+    return io.TextIOWrapper(open_input(filename), encoding='utf-8', newline='')
+
+
+def decompress_command(filename: str) -> Optional[str]:
+    """解压该文件的shell命令（用于psql的FROM PROGRAM），未压缩时返回None"""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if filename.endswith(suffix):
+            return f'{DECOMPRESS_COMMANDS[compression]} "{filename}"'
+    return None
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='把（可能已压缩的）生成文件依次解压到标准输出')
+    parser.add_argument('files', nargs='+', help='gzip、zstd或未压缩的文件')
+    args = parser.parse_args()
+    for filename in args.files:
+        with open_input(filename) as f:
+            shutil.copyfileobj(f, sys.stdout.buffer, BUFFER_SIZE)
+    sys.stdout.buffer.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PostgreSQL COPY格式导出
+生成themes和expressions表的COPY数据文件（text格式，制表符分隔），以及执行导入的psql驱动脚本。
+COPY数据文件不经过SQL引号转义，字段中的反斜杠、制表符和换行按COPY text格式转义，NULL写作\\N。
+各生成器把本次实际写出的数据文件登记到copy_manifest.json（只替换自己负责的表），
+驱动脚本和load_database.py --from-copy都只导入清单中登记的文件，不在目录中查找
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence
+
+from compressed_output import decompress_command, open_output
+
+THEMES_COPY_FILE = 'themes_copy.tsv'
+THEME_CLOSURE_COPY_FILE = 'theme_closure_copy.tsv'
+EXPRESSIONS_COPY_FILE = 'expressions_copy.tsv'
+TAGS_COPY_FILE = 'expression_tags_copy.tsv'
+PRONUNCIATIONS_COPY_FILE = 'expression_pronunciations_copy.tsv'
+EXPRESSION_THEMES_COPY_FILE = 'expression_themes_copy.tsv'
+VARIANTS_COPY_FILE = 'expression_variants_copy.tsv'
+COPY_DRIVER_FILE = 'copy_load.sql'
+COPY_MANIFEST_FILE = 'copy_manifest.json'
+
+THEMES_COPY_COLUMNS = ['id', 'name', 'parent_id', 'level', 'sort_order', 'is_active', 'expression_count',
+                       'subtree_expression_count', 'lft', 'rgt']
+
+THEME_CLOSURE_COPY_COLUMNS = ['ancestor_id', 'descendant_id', 'depth']
+
+EXPRESSIONS_COPY_COLUMNS = [
+    'id', 'theme_id_l1', 'theme_id_l2', 'theme_id_l3', 'text', 'text_normalized', 'region',
+    'definition', 'usage_notes', 'formality_level', 'frequency',
+    'phonetic_notation', 'notation_system', 'pronunciation_verified',
+    'contributor_id', 'status', 'created_at', 'updated_at',
+]
+
+TAGS_COPY_COLUMNS = ['expression_id', 'tag']
+
+EXPRESSION_THEMES_COPY_COLUMNS = ['expression_id', 'theme_id']
+
+VARIANTS_COPY_COLUMNS = ['expression_id', 'variant', 'form', 'folded_key', 'is_primary']
+
+PRONUNCIATIONS_COPY_COLUMNS = [
+    'expression_id', 'reading', 'jyutping', 'syllable_count', 'initials', 'finals', 'tones',
+    'changed_tones', 'toneless_key', 'initials_key', 'is_valid',
+]
+
+# themes表在基础表结构之外增加的列：下级词条总数和嵌套集合区间
+THEMES_EXTRA_COLUMNS_DDL = """ALTER TABLE themes ADD COLUMN IF NOT EXISTS subtree_expression_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE themes ADD COLUMN IF NOT EXISTS lft INTEGER;
+ALTER TABLE themes ADD COLUMN IF NOT EXISTS rgt INTEGER;
+CREATE INDEX IF NOT EXISTS idx_themes_lft_rgt ON themes (lft, rgt);"""
+
+# theme_closure表结构，每个主题与其自身及所有上级主题各一行（自身的depth为0）
+THEME_CLOSURE_DDL = """CREATE TABLE IF NOT EXISTS theme_closure (
+  ancestor_id INTEGER NOT NULL REFERENCES themes(id),
+  descendant_id INTEGER NOT NULL REFERENCES themes(id),
+  depth SMALLINT NOT NULL,
+  PRIMARY KEY (ancestor_id, descendant_id)
+);
+CREATE INDEX IF NOT EXISTS idx_theme_closure_descendant ON theme_closure (descendant_id, depth);"""
+
+# 附属表的expression_id都引用expressions.id（即CSV的index列），删除词条时一并删除
+
+# expression_tags表结构，每个【…】标记一行
+EXPRESSION_TAGS_DDL = """CREATE TABLE IF NOT EXISTS expression_tags (
+  expression_id INTEGER NOT NULL REFERENCES expressions(id) ON DELETE CASCADE,
+  tag VARCHAR(16) NOT NULL,
+  PRIMARY KEY (expression_id, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_expression_tags_tag ON expression_tags (tag, expression_id);"""
+
+# expression_pronunciations表结构，每种读法一行；声母为空字符串表示零声母，无法解析的音节各项为NULL
+EXPRESSION_PRONUNCIATIONS_DDL = """CREATE TABLE IF NOT EXISTS expression_pronunciations (
+  expression_id INTEGER NOT NULL REFERENCES expressions(id) ON DELETE CASCADE,
+  reading SMALLINT NOT NULL,
+  jyutping TEXT NOT NULL,
+  syllable_count SMALLINT NOT NULL,
+  initials TEXT[] NOT NULL,
+  finals TEXT[] NOT NULL,
+  tones SMALLINT[] NOT NULL,
+  changed_tones SMALLINT[] NOT NULL,
+  toneless_key TEXT NOT NULL,
+  initials_key TEXT NOT NULL,
+  is_valid BOOLEAN NOT NULL,
+  PRIMARY KEY (expression_id, reading)
+);
+CREATE INDEX IF NOT EXISTS idx_expression_pronunciations_toneless ON expression_pronunciations (toneless_key);
+CREATE INDEX IF NOT EXISTS idx_expression_pronunciations_initials ON expression_pronunciations (initials_key);"""
+
+# expression_themes表结构（去重模式），词条在每个所属主题下各一行，theme_id为最深一级的主题
+EXPRESSION_THEMES_DDL = """CREATE TABLE IF NOT EXISTS expression_themes (
+  expression_id INTEGER NOT NULL REFERENCES expressions(id) ON DELETE CASCADE,
+  theme_id INTEGER NOT NULL REFERENCES themes(id),
+  PRIMARY KEY (expression_id, theme_id)
+);
+CREATE INDEX IF NOT EXISTS idx_expression_themes_theme ON expression_themes (theme_id, expression_id);"""
+
+# expression_variants表结构，每种具体写法一行（variant为1的是基本写法），folded_key为繁简折叠键
+EXPRESSION_VARIANTS_DDL = """CREATE TABLE IF NOT EXISTS expression_variants (
+  expression_id INTEGER NOT NULL REFERENCES expressions(id) ON DELETE CASCADE,
+  variant SMALLINT NOT NULL,
+  form TEXT NOT NULL,
+  folded_key TEXT NOT NULL,
+  is_primary BOOLEAN NOT NULL,
+  PRIMARY KEY (expression_id, variant)
+);
+CREATE INDEX IF NOT EXISTS idx_expression_variants_form ON expression_variants (form);
+CREATE INDEX IF NOT EXISTS idx_expression_variants_folded_key ON expression_variants (folded_key);"""
+
+# COPY text格式中需要转义的字符
+_COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def copy_field(value) -> str:
+    """把单个值转换为COPY text格式的字段"""
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, str):
+        return value.replace('\x00', '').translate(_COPY_ESCAPES)
+    return str(value)
+
+
+def copy_line(values: Sequence) -> str:
+    """把一行值转换为COPY text格式的一行（含换行符）"""
+    return '\t'.join([copy_field(value) for value in values]) + '\n'
+
+
+def write_copy_lines(filename: str, lines: Iterable[str], compression: Optional[str] = None) -> int:
+    """写入已转换为COPY格式的数据行（可边写边压缩），返回写入的行数"""
+    count = 0
+    with open_output(filename, compression, newline='\n') as f:
+        for line in lines:
+            f.write(line)
+            count += 1
+    return count
+
+
+def write_copy_file(filename: str, rows: Iterable[Sequence], compression: Optional[str] = None) -> int:
+    """写入COPY数据文件，返回写入的行数"""
+    return write_copy_lines(filename, (copy_line(values) for values in rows), compression)
+
+
+COPY_SOURCES = {
+    'themes': (THEMES_COPY_COLUMNS, THEMES_COPY_FILE),
+    'theme_closure': (THEME_CLOSURE_COPY_COLUMNS, THEME_CLOSURE_COPY_FILE),
+    'expressions': (EXPRESSIONS_COPY_COLUMNS, EXPRESSIONS_COPY_FILE),
+    'expression_themes': (EXPRESSION_THEMES_COPY_COLUMNS, EXPRESSION_THEMES_COPY_FILE),
+    'expression_tags': (TAGS_COPY_COLUMNS, TAGS_COPY_FILE),
+    'expression_pronunciations': (PRONUNCIATIONS_COPY_COLUMNS, PRONUNCIATIONS_COPY_FILE),
+    'expression_variants': (VARIANTS_COPY_COLUMNS, VARIANTS_COPY_FILE),
+}
+
+# 导入前需要执行的建表语句
+COPY_SETUP_SQL = {
+    'themes': THEMES_EXTRA_COLUMNS_DDL,
+    'theme_closure': THEME_CLOSURE_DDL,
+    'expression_themes': EXPRESSION_THEMES_DDL,
+    'expression_tags': EXPRESSION_TAGS_DDL,
+    'expression_pronunciations': EXPRESSION_PRONUNCIATIONS_DDL,
+    'expression_variants': EXPRESSION_VARIANTS_DDL,
+}
+
+
+# 各生成器负责的表，每次运行时这些表在清单中的记录全部替换为本次写出的文件
+THEMES_COPY_TABLES = ['themes', 'theme_closure']
+EXPRESSIONS_COPY_TABLES = ['expressions', 'expression_themes', 'expression_tags', 'expression_pronunciations',
+                           'expression_variants']
+
+# build.py在同一进程中并发执行themes和expressions的生成，清单和驱动脚本的更新需要互斥
+_manifest_lock = threading.Lock()
+
+
+def load_copy_manifest(path: str = COPY_MANIFEST_FILE) -> Dict[str, str]:
+    """读取已登记的COPY数据文件 {表名: 文件名}，清单不存在时返回空字典"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['files']
+
+
+def generate_copy_driver(files: Dict[str, str]) -> str:
+    """生成psql驱动脚本，files为要导入的数据文件 {表名: 文件名}，按COPY_SOURCES的顺序导入，
+    themes必须先于expressions导入（theme_id_l1..l3外键）；压缩的数据文件通过FROM PROGRAM边解压边导入
+    """
+    lines = []
+    lines.append("-- 自动生成的COPY导入脚本")
+    lines.append("-- 在数据文件所在目录执行: psql -v ON_ERROR_STOP=1 -f " + COPY_DRIVER_FILE)
+    lines.append("")
+    lines.append("BEGIN;")
+    for table, (columns, _) in COPY_SOURCES.items():
+        if table not in files:
+            continue
+        filename = files[table]
+        lines.append("")
+        lines.append(f"-- 导入{table}数据")
+        if table in COPY_SETUP_SQL:
+            lines.append(COPY_SETUP_SQL[table])
+        command = decompress_command(filename)
+        source = f"PROGRAM '{command}'" if command else f"'{filename}'"
+        lines.append(f"\\copy {table} ({', '.join(columns)}) FROM {source} "
+                     f"WITH (FORMAT text, ENCODING 'UTF8')")
+    sequences = [table for table in ('themes', 'expressions') if table in files]
+    if sequences:
+        lines.append("")
+        lines.append("-- 重置序列")
+        for table in sequences:
+            lines.append(f"SELECT setval('{table}_id_seq', (SELECT MAX(id) FROM {table}));")
+    lines.append("")
+    lines.append("COMMIT;")
+    return '\n'.join(lines) + '\n'
+
+
+def write_copy_driver(owned_tables: Sequence[str], files: Dict[str, str],
+                      manifest_file: str = COPY_MANIFEST_FILE) -> Dict[str, str]:
+    """登记本次写出的数据文件并重新生成驱动脚本，返回登记后的全部文件
+
+    owned_tables为调用方负责的表，它们原有的记录（包括本次没有生成的表）全部替换为files
+    """
+    with _manifest_lock:
+        registered = {table: filename for table, filename in load_copy_manifest(manifest_file).items()
+                      if table not in owned_tables}
+        registered.update(files)
+        data = {
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'files': {table: registered[table] for table in COPY_SOURCES if table in registered},
+        }
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        with open(COPY_DRIVER_FILE, 'w', encoding='utf-8') as f:
+            f.write(generate_copy_driver(data['files']))
+    return data['files']
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Satgwong_processed.csv的共享解析缓存
+CSV只解析一次，解析结果以二进制形式缓存到磁盘，缓存以文件大小、修改时间和内容哈希为键，
+generate_themes_sql.py和generate_expressions_sql.py都通过这里读取数据
+"""
+
+import csv
+import hashlib
+import os
+import pickle
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CACHE_VERSION = 1
+CACHE_DIR = '.cache'
+
+# 进程内缓存: {csv绝对路径: ((size, mtime_ns), columns)}
+_memory_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, List[str]]]] = {}
+
+
+def file_sha256(path: str) -> str:
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path_for(csv_file: str, cache_dir: Optional[str] = None) -> str:
+    """缓存文件路径，默认放在CSV所在目录的.cache下"""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_file)), CACHE_DIR)
+    return os.path.join(cache_dir, os.path.basename(csv_file) + '.pkl')
+
+
+def parse_csv(csv_file: str) -> Dict[str, List[str]]:
+    """解析CSV为按列存储的字符串列表，缺失值统一为空字符串"""
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        columns = {name: [] for name in header}
+        lists = [columns[name] for name in header]
+        width = len(header)
+        for row in reader:
+            if len(row) < width:
+                row = row + [''] * (width - len(row))
+            for values, value in zip(lists, row):
+                values.append(value)
+    return columns
+
+
+def _read_cache(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(payload, dict) or payload.get('version') != CACHE_VERSION:
+        return None
+    return payload
+
+
+def _write_cache(path: str, payload: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_columns(csv_file: str = 'Satgwong_processed.csv', cache_dir: Optional[str] = None,
+                 use_cache: bool = True) -> Dict[str, List[str]]:
+    """加载词典数据（按列存储），优先使用缓存
+
+    大小和修改时间都未变化时直接读取缓存；修改时间变化但内容哈希一致时同样复用缓存，
+    只有内容真正变化时才重新解析CSV。
+    """
+    stat = os.stat(csv_file)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    key = os.path.abspath(csv_file)
+
+    if use_cache and key in _memory_cache and _memory_cache[key][0] == stamp:
+        return _memory_cache[key][1]
+
+    path = cache_path_for(csv_file, cache_dir)
+    payload = _read_cache(path) if use_cache else None
+    if payload is not None and payload['size'] == stat.st_size:
+        if payload['mtime_ns'] == stat.st_mtime_ns:
+            _memory_cache[key] = (stamp, payload['columns'])
+            return payload['columns']
+        content_hash = file_sha256(csv_file)
+        if payload['sha256'] == content_hash:
+            # 内容未变，仅刷新缓存中的修改时间
+            payload['mtime_ns'] = stat.st_mtime_ns
+            _write_cache(path, payload)
+            _memory_cache[key] = (stamp, payload['columns'])
+            return payload['columns']
+    else:
+        content_hash = file_sha256(csv_file)
+
+    print(f"正在解析CSV文件: {csv_file}")
+    columns = parse_csv(csv_file)
+    if use_cache:
+        _write_cache(path, {
+            'version': CACHE_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': content_hash,
+            'columns': columns,
+        })
+        _memory_cache[key] = (stamp, columns)
+    return columns
+
+
+def clear_cache(csv_file: str, cache_dir: Optional[str] = None) -> None:
+    """删除指定CSV的磁盘缓存和进程内缓存"""
+    _memory_cache.pop(os.path.abspath(csv_file), None)
+    path = cache_path_for(csv_file, cache_dir)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def iter_csv_rows(csv_file: str) -> Iterator[Dict[str, str]]:
+    """不经过缓存，逐行流式读取CSV，内存占用与文件大小无关"""
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as file:
+        for row in csv.DictReader(file, restval=''):
+            row.pop(None, None)
+            yield row
+
+
+def row_count(columns: Dict[str, List[str]]) -> int:
+    """记录条数"""
+    return len(next(iter(columns.values()), []))
+
+
+def iter_records(columns: Dict[str, List[str]]) -> Iterator[Dict[str, str]]:
+    """按行遍历记录，每行为{列名: 值}，与csv.DictReader的行格式相同"""
+    names = list(columns.keys())
+    for values in zip(*(columns[name] for name in names)):
+        yield dict(zip(names, values))
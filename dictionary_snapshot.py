@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词典的二进制快照
+把DictionaryStore的列存储写成一个带版本号的二进制文件：定宽的偏移表加UTF-8字符串堆，
+读取时mmap整个文件，各列直接以memoryview引用文件内容（零拷贝），不需要导入pandas、解析CSV。
+
+python dictionary_snapshot.py --csv Satgwong_processed.csv --output satgwong.snapshot
+
+文件结构（小端序，各段按8字节对齐）：
+  文件头   magic(4) version(u32) rows(u64) sections(u64) source_sha256(64字节十六进制)
+  段目录   每段 name(32字节) offset(u64) length(u64)
+  数据段   expression_ids(i64[rows])
+           {words,jyutping,meanings,note}.offsets(u64[rows+1]) / .heap(UTF-8)
+           categories.offsets(u64[n+1]) / categories.heap / theme_ids(u32[n])
+           category_1..3(u32[rows]，categories中的编号)
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from dictionary_store import DictionaryStore, TextColumn, TEXT_COLUMNS, CATEGORY_COLUMNS, REGISTRY_FILE
+
+SNAPSHOT_FILE = 'satgwong.snapshot'
+SNAPSHOT_MAGIC = b'SGDS'
+SNAPSHOT_VERSION = 1
+
+HEADER = struct.Struct('<4sIQQ64s')
+SECTION = struct.Struct('<32sQQ')
+ALIGNMENT = 8
+
+
+def _padding(position: int) -> int:
+    return -position % ALIGNMENT
+
+
+def snapshot_sections(store: DictionaryStore) -> List[Tuple[str, bytes]]:
+    """快照的各数据段: [(段名, 内容)]"""
+    sections = [('expression_ids', array('q', store.expression_ids).tobytes())]
+    for name in TEXT_COLUMNS:
+        column = store.text[name]
+        sections.append((f'{name}.offsets', array('Q', column.offsets).tobytes()))
+        sections.append((f'{name}.heap', bytes(column.data)))
+    names = TextColumn.from_strings(store.category_names)
+    sections.append(('categories.offsets', names.offsets.tobytes()))
+    sections.append(('categories.heap', names.data))
+    sections.append(('theme_ids', array('I', store.theme_ids).tobytes()))
+    for name, codes in zip(CATEGORY_COLUMNS, store.category_codes):
+        sections.append((name, array('I', codes).tobytes()))
+    return sections
+
+
+def write_snapshot(store: DictionaryStore, path: str = SNAPSHOT_FILE, source_sha256: str = '') -> int:
+    """写入快照文件（先写临时文件再替换），返回文件字节数"""
+    if sys.byteorder != 'little':
+        raise RuntimeError("快照格式为小端序，当前平台不支持")
+    sections = snapshot_sections(store)
+    position = HEADER.size + SECTION.size * len(sections)
+    position += _padding(position)
+    directory = []
+    for name, data in sections:
+        directory.append(SECTION.pack(name.encode('ascii'), position, len(data)))
+        position += len(data) + _padding(len(data))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(store), len(sections),
+                            source_sha256.encode('ascii').ljust(64, b'\0')))
+        f.write(b''.join(directory))
+        f.write(b'\0' * _padding(f.tell()))
+        for _, data in sections:
+            f.write(data)
+            f.write(b'\0' * _padding(len(data)))
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+class SnapshotStore(DictionaryStore):
+    """mmap打开的快照，各列均为文件内容的memoryview；用完后调用close()或用with语句"""
+
+    def __init__(self, path: str = SNAPSHOT_FILE):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        self._views = []
+        try:
+            magic, version, rows, section_count, source_sha256 = HEADER.unpack_from(self._buffer, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"不是词典快照文件: {path}")
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"不支持的快照版本: {version}")
+            self.source_sha256 = source_sha256.rstrip(b'\0').decode('ascii')
+            sections = {}
+            for i in range(section_count):
+                name, offset, length = SECTION.unpack_from(self._buffer, HEADER.size + SECTION.size * i)
+                sections[name.rstrip(b'\0').decode('ascii')] = (offset, length)
+
+            text = {name: TextColumn(self._section(sections, f'{name}.heap'),
+                                     self._section(sections, f'{name}.offsets', 'Q'))
+                    for name in TEXT_COLUMNS}
+            # 分类名称只有几百个，直接解码为字符串列表
+            names = TextColumn(self._section(sections, 'categories.heap'),
+                               self._section(sections, 'categories.offsets', 'Q'))
+            category_names = [sys.intern(names[i]) for i in range(len(names))]
+            super().__init__(self._section(sections, 'expression_ids', 'q'), text, category_names,
+                             [self._section(sections, name, 'I') for name in CATEGORY_COLUMNS],
+                             self._section(sections, 'theme_ids', 'I'))
+            if len(self.expression_ids) != rows:
+                raise ValueError(f"快照文件已损坏: {path}")
+        except Exception:
+            self.close()
+            raise
+
+    def _section(self, sections: Dict[str, Tuple[int, int]], name: str, format: Optional[str] = None) -> memoryview:
+        offset, length = sections[name]
+        view = self._buffer[offset:offset + length]
+        if format:
+            view = view.cast(format)
+        self._views.append(view)
+        return view
+
+    def close(self) -> None:
+        """释放全部memoryview并关闭mmap，之后不能再访问记录"""
+        if self._mmap is None:
+            return
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._buffer.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def __enter__(self) -> 'SnapshotStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_snapshot(path: str = SNAPSHOT_FILE) -> SnapshotStore:
+    """打开快照文件"""
+    return SnapshotStore(path)
+
+
+def build_snapshot(csv_file: str = 'Satgwong_processed.csv', path: str = SNAPSHOT_FILE,
+                   registry_file: str = REGISTRY_FILE) -> int:
+    """由词典CSV构建快照，返回文件字节数；文件头记录CSV的SHA-256，用于判断快照是否过期"""
+    from dictionary_cache import file_sha256
+    from dictionary_store import load_dictionary_store
+
+    store = load_dictionary_store(csv_file, registry_file)
+    return write_snapshot(store, path, file_sha256(csv_file))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='生成词典的二进制快照')
+    parser.add_argument('--csv', default='Satgwong_processed.csv', help='词典CSV文件')
+    parser.add_argument('--output', default=SNAPSHOT_FILE, help='快照文件')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    size = build_snapshot(args.csv, args.output)
+    print(f"快照已生成: {args.output} ({size} 字节, {time.perf_counter() - start:.2f} 秒)")
+
+    start = time.perf_counter()
+    with open_snapshot(args.output) as store:
+        count = len(store)
+    print(f"快照打开耗时: {(time.perf_counter() - start) * 1000:.2f} 毫秒 ({count} 条记录)")
+
+
+if __name__ == '__main__':
+    main()
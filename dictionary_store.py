@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑的内存词典存储，供长期运行的服务在进程内嵌入词典
+文本列以UTF-8拼接为一个bytes并用偏移数组定位，按需解码；三级分类名称只保存一份，
+每行只存分类编号，并换算为主题ID；记录以__slots__视图对象访问，不为每行创建dict。
+按词条、粤拼和主题ID的查找索引在首次使用时建立；解析CSV和建索引所需的模块也在用到时才导入，
+从快照（dictionary_snapshot.py）打开时不需要导入它们。
+"""
+
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Union
+
+from theme_registry import REGISTRY_FILE, load_theme_mapping
+
+TEXT_COLUMNS = ['words', 'jyutping', 'meanings', 'note']
+CATEGORY_COLUMNS = ['category_1', 'category_2', 'category_3']
+
+# 查找索引的值：只有一行时直接存行号，多行时存行号数组
+Postings = Union[int, array]
+
+
+class TextColumn:
+    """UTF-8拼接存储的字符串列，第i个值为data[offsets[i]:offsets[i + 1]]"""
+
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data: bytes, offsets: array):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, values: Iterable[str]) -> 'TextColumn':
+        offsets = array('Q', [0])
+        parts = []
+        position = 0
+        for value in values:
+            encoded = value.encode('utf-8')
+            parts.append(encoded)
+            position += len(encoded)
+            offsets.append(position)
+        return cls(b''.join(parts), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        # data可以是bytes，也可以是快照文件的memoryview
+        return str(self.data[self.offsets[row]:self.offsets[row + 1]], 'utf-8')
+
+    def nbytes(self) -> int:
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class ExpressionRecord:
+    """词典中一行的只读视图"""
+
+    __slots__ = ('_store', 'row')
+
+    def __init__(self, store: 'DictionaryStore', row: int):
+        self._store = store
+        self.row = row
+
+    @property
+    def expression_id(self) -> int:
+        """expressions.id（即CSV的index列）"""
+        return self._store.expression_ids[self.row]
+
+    @property
+    def words(self) -> str:
+        return self._store.text['words'][self.row]
+
+    @property
+    def jyutping(self) -> str:
+        return self._store.text['jyutping'][self.row]
+
+    @property
+    def meanings(self) -> str:
+        return self._store.text['meanings'][self.row]
+
+    @property
+    def note(self) -> str:
+        return self._store.text['note'][self.row]
+
+    @property
+    def categories(self) -> List[str]:
+        """一至三级分类名称，缺失的为空字符串"""
+        store = self._store
+        return [store.category_names[codes[self.row]] for codes in store.category_codes]
+
+    @property
+    def theme_ids(self) -> List[Optional[int]]:
+        """一至三级主题ID，登记表中没有的分类为None"""
+        store = self._store
+        return [store.theme_ids[codes[self.row]] or None for codes in store.category_codes]
+
+    def to_dict(self) -> Dict:
+        theme_id_l1, theme_id_l2, theme_id_l3 = self.theme_ids
+        category_1, category_2, category_3 = self.categories
+        return {
+            'expression_id': self.expression_id,
+            'words': self.words,
+            'jyutping': self.jyutping,
+            'meanings': self.meanings,
+            'note': self.note,
+            'category_1': category_1,
+            'category_2': category_2,
+            'category_3': category_3,
+            'theme_id_l1': theme_id_l1,
+            'theme_id_l2': theme_id_l2,
+            'theme_id_l3': theme_id_l3,
+        }
+
+    def __repr__(self) -> str:
+        return f"ExpressionRecord({self.expression_id}, {self.words!r})"
+
+
+def _add_posting(index: Dict[str, Postings], key, row: int) -> None:
+    postings = index.get(key)
+    if postings is None:
+        index[key] = row
+    elif isinstance(postings, int):
+        if postings != row:
+            index[key] = array('I', [postings, row])
+    elif postings[-1] != row:
+        postings.append(row)
+
+
+def _rows(postings: Optional[Postings]) -> List[int]:
+    if postings is None:
+        return []
+    if isinstance(postings, int):
+        return [postings]
+    return list(postings)
+
+
+class DictionaryStore:
+    def __init__(self, expression_ids: array, text: Dict[str, TextColumn], category_names: List[str],
+                 category_codes: List[array], theme_ids: array):
+        """category_codes[level][row]为category_names中的编号（0为空分类），theme_ids[编号]为主题ID（0为无）"""
+        self.expression_ids = expression_ids
+        self.text = text
+        self.category_names = category_names
+        self.category_codes = category_codes
+        self.theme_ids = theme_ids
+        self._word_index = None
+        self._jyutping_index = None
+        self._theme_index = None
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, List[str]],
+                     theme_mapping: Optional[Dict[str, int]] = None) -> 'DictionaryStore':
+        """由load_columns()的按列数据构建，与generate_sql()一样跳过没有词条文本的行"""
+        from dictionary_cache import row_count
+        from generate_expressions_sql import source_expression_id
+
+        theme_mapping = theme_mapping or {}
+        rows = [row for row, words in enumerate(columns.get('words', [])) if words.strip()]
+        empty = [''] * row_count(columns)
+
+        expression_ids = array('q', (source_expression_id(columns['index'][row]) for row in rows))
+        text = {}
+        for name in TEXT_COLUMNS:
+            values = columns.get(name, empty)
+            text[name] = TextColumn.from_strings(values[row].strip().replace('\x00', '') for row in rows)
+
+        # 分类名称驻留：每个名称只保存一份，行中只存编号
+        category_names = ['']
+        codes_by_name = {'': 0}
+        category_codes = []
+        for name in CATEGORY_COLUMNS:
+            values = columns.get(name, empty)
+            codes = array('I')
+            for row in rows:
+                category = values[row].strip()
+                code = codes_by_name.get(category)
+                if code is None:
+                    code = codes_by_name[category] = len(category_names)
+                    category_names.append(sys.intern(category))
+                codes.append(code)
+            category_codes.append(codes)
+        theme_ids = array('I', (theme_mapping.get(name, 0) for name in category_names))
+        return cls(expression_ids, text, category_names, category_codes, theme_ids)
+
+    def __len__(self) -> int:
+        return len(self.expression_ids)
+
+    def __getitem__(self, row: int) -> ExpressionRecord:
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return ExpressionRecord(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield ExpressionRecord(self, row)
+
+    def _build_word_index(self) -> Dict[str, Postings]:
+        """原文、标准化文本、展开的各种写法及其繁简折叠键各建一项"""
+        from generate_expressions_sql import normalize_text
+        from headword_variants import expand_variants, fold_key
+
+        index = {}
+        words = self.text['words']
+        for row in range(len(self)):
+            word = words[row]
+            _add_posting(index, word, row)
+            _add_posting(index, normalize_text(word), row)
+            for form in expand_variants(word):
+                _add_posting(index, form, row)
+                _add_posting(index, fold_key(form), row)
+        return index
+
+    def _build_jyutping_index(self) -> Dict[str, Postings]:
+        """每种读法按带声调的粤拼和去声调键各建一项"""
+        from jyutping import parse_jyutping
+
+        index = {}
+        jyutping = self.text['jyutping']
+        for row in range(len(self)):
+            for reading in parse_jyutping(jyutping[row]):
+                _add_posting(index, reading['jyutping'], row)
+                _add_posting(index, reading['toneless_key'], row)
+        return index
+
+    def _build_theme_index(self) -> Dict[int, Postings]:
+        """任一级主题ID对应的行，因此上级主题包含其所有下级主题的词条"""
+        index = {}
+        theme_ids = self.theme_ids
+        for row in range(len(self)):
+            for codes in self.category_codes:
+                theme_id = theme_ids[codes[row]]
+                if theme_id:
+                    _add_posting(index, theme_id, row)
+        return index
+
+    def lookup_word(self, word: str) -> List[ExpressionRecord]:
+        """按词条查找，原文、标准化文本（去掉*、括号等标记）、任一种写法或其繁简折叠键相同即命中"""
+        from generate_expressions_sql import normalize_text
+        from headword_variants import fold_key
+
+        if self._word_index is None:
+            self._word_index = self._build_word_index()
+        rows = set(_rows(self._word_index.get(word.strip())))
+        rows.update(_rows(self._word_index.get(normalize_text(word))))
+        rows.update(_rows(self._word_index.get(fold_key(word))))
+        return [ExpressionRecord(self, row) for row in sorted(rows)]
+
+    def lookup_jyutping(self, jyutping: str) -> List[ExpressionRecord]:
+        """按粤拼查找：带声调时精确匹配（ngo5 dei6），不带声调时按去声调键匹配（ngo dei）"""
+        if self._jyutping_index is None:
+            self._jyutping_index = self._build_jyutping_index()
+        key = ' '.join(jyutping.lower().split())
+        return [ExpressionRecord(self, row) for row in _rows(self._jyutping_index.get(key))]
+
+    def lookup_theme(self, theme_id: int) -> List[ExpressionRecord]:
+        """按主题ID查找，一级、二级主题包含其下所有词条"""
+        if self._theme_index is None:
+            self._theme_index = self._build_theme_index()
+        return [ExpressionRecord(self, row) for row in _rows(self._theme_index.get(theme_id))]
+
+    def nbytes(self) -> int:
+        """列存储占用的字节数（不含查找索引）"""
+        total = self.expression_ids.itemsize * len(self.expression_ids)
+        total += sum(column.nbytes() for column in self.text.values())
+        total += sum(codes.itemsize * len(codes) for codes in self.category_codes)
+        total += sum(sys.getsizeof(name) for name in self.category_names)
+        total += self.theme_ids.itemsize * len(self.theme_ids)
+        return total
+
+
+def load_dictionary_store(csv_file: str = 'Satgwong_processed.csv',
+                          registry_file: str = REGISTRY_FILE) -> DictionaryStore:
+    """通过解析缓存读取词典CSV并构建紧凑存储，主题ID取自主题登记表"""
+    from dictionary_cache import load_columns
+
+    return DictionaryStore.from_columns(load_columns(csv_file), load_theme_mapping(registry_file))
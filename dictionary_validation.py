@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词典CSV的数据校验
+在生成和加载之前用pandas按列批量检查全部行，一次写出结构化的校验报告（validation_report.json）：
+index列、缺失或格式错误的分类、二级/三级分类编号与上级不一致（如'三A生活用品和設施三'下的'A1衣、褲、裙'）、
+主题登记表中没有的分类（生成时theme_id会是NULL）、空白或格式错误的粤拼。
+会导致id冲突或theme_id为NULL的问题为error级别，存在时立即失败，不再进行耗时的完整生成和加载；
+分类编号格式和粤拼的问题不影响生成（分类仍按名称在登记表中解析，无法解析的读法is_valid为false），为warning级别。
+
+python dictionary_validation.py --csv Satgwong_processed.csv
+"""
+
+import json
+import sys
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+
+from dictionary_cache import load_columns
+from jyutping import parse_jyutping, JYUTPING_VALUE_PATTERN
+from theme_registry import load_theme_mapping, REGISTRY_FILE
+
+VALIDATION_REPORT_FILE = 'validation_report.json'
+
+CATEGORY_COLUMNS = ['category_1', 'category_2', 'category_3']
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# 每项检查在报告中列出的样例行数和不同取值数
+MAX_SAMPLES = 20
+MAX_VALUES = 20
+
+# 分类编号：一级为中文数字加顿号（一、人物），二级加大写字母（一A泛稱），三级再加数字（一A1人稱、指代）
+NUMERAL = '[一二三四五六七八九十]+'
+CATEGORY_CODE_PATTERNS = {
+    'category_1': rf'({NUMERAL})、',
+    'category_2': rf'({NUMERAL}[A-Z])(?![A-Z0-9])',
+    'category_3': rf'({NUMERAL}[A-Z])\d+(?!\d)',
+}
+# 名称末尾的中文数字通常是下一级分类编号被截断后残留的（'三A生活用品和設施三'）
+TRAILING_NUMERAL_PATTERN = rf'.*{NUMERAL}'
+
+
+class ValidationReport:
+    def __init__(self, frame: pd.DataFrame, csv_file: Optional[str] = None):
+        self.frame = frame
+        self.csv_file = csv_file
+        self.checks = {}  # {检查名: {severity, description, count, values, samples}}
+
+    def add(self, name: str, severity: str, description: str, mask: pd.Series, column: str,
+            values: Optional[pd.Series] = None) -> None:
+        """记录一项检查的结果，mask为出问题的行，values为报告中显示的取值（默认为column列）"""
+        if not mask.any():
+            return
+        if values is None:
+            values = self.frame[column]
+        bad = values[mask]
+        counts = bad.value_counts()
+        rows = bad.index[:MAX_SAMPLES]
+        index = self.frame['index'] if 'index' in self.frame else pd.Series(None, index=self.frame.index)
+        self.checks[name] = {
+            'severity': severity,
+            'description': description,
+            'column': column,
+            'count': int(mask.sum()),
+            'values': [{'value': value, 'rows': int(count)} for value, count in counts.head(MAX_VALUES).items()],
+            # line为CSV文件中的行号（含表头）
+            'samples': [{'line': int(row) + 2, 'index': index.at[row], 'value': bad.at[row]}
+                        for row in rows],
+        }
+
+    def count(self, severity: str) -> int:
+        return sum(check['count'] for check in self.checks.values() if check['severity'] == severity)
+
+    @property
+    def ok(self) -> bool:
+        return self.count(ERROR) == 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'csv': self.csv_file,
+            'rows': len(self.frame),
+            'errors': self.count(ERROR),
+            'warnings': self.count(WARNING),
+            'checks': self.checks,
+        }
+
+    def write(self, path: str = VALIDATION_REPORT_FILE) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+    def summary(self) -> str:
+        lines = [f"校验完成: {len(self.frame)} 行, {self.count(ERROR)} 个错误, {self.count(WARNING)} 个警告"]
+        for name, check in self.checks.items():
+            lines.append(f"  [{check['severity']}] {name}: {check['count']} 行 - {check['description']}")
+        return '\n'.join(lines)
+
+
+def _strip(frame: pd.DataFrame, column: str) -> pd.Series:
+    if column not in frame:
+        return pd.Series('', index=frame.index, dtype=object)
+    return frame[column].fillna('').astype(str).str.strip()
+
+
+def validate_frame(frame: pd.DataFrame, theme_mapping: Dict[str, int],
+                   csv_file: Optional[str] = None) -> ValidationReport:
+    """按列校验词典数据；没有词条文本的行在生成时被跳过，只报告一次警告，不参与其他检查"""
+    frame = frame.reset_index(drop=True)
+    report = ValidationReport(frame, csv_file)
+    index = _strip(frame, 'index')
+    words = _strip(frame, 'words')
+    jyutping = _strip(frame, 'jyutping')
+    cats = {column: _strip(frame, column) for column in CATEGORY_COLUMNS}
+    used = words != ''
+
+    report.add('words_blank', WARNING, '词条文本为空，生成时跳过', ~used, 'words', words)
+
+    report.add('index_invalid', ERROR, 'index列不是整数，无法作为expressions.id',
+               used & ~index.str.fullmatch(r'-?\d+'), 'index', index)
+    report.add('index_duplicate', ERROR, 'index列重复，expressions.id会冲突',
+               used & index.duplicated(keep='first') & (index != ''), 'index', index)
+
+    # 分类层级：有下级分类时上级分类不能为空，否则生成主题树时整行被跳过
+    present = {column: cats[column] != '' for column in CATEGORY_COLUMNS}
+    report.add('category_1_missing', ERROR, '有二级分类但一级分类为空',
+               used & present['category_2'] & ~present['category_1'], 'category_2', cats['category_2'])
+    report.add('category_2_missing', ERROR, '有三级分类但二级分类为空',
+               used & present['category_3'] & ~present['category_2'], 'category_3', cats['category_3'])
+
+    # 分类编号：主题按名称登记，编号格式不影响theme_id，只作为源数据的问题报告
+    codes = {}
+    for column in CATEGORY_COLUMNS:
+        codes[column] = cats[column].str.extract('^' + CATEGORY_CODE_PATTERNS[column], expand=False)
+        report.add(f'{column}_malformed', WARNING, '分类名称不以本级编号开头',
+                   used & present[column] & codes[column].isna(), column, cats[column])
+        report.add(f'{column}_truncated', WARNING, '分类名称以中文数字结尾，可能混入了下一级分类的编号',
+                   used & cats[column].str.fullmatch(TRAILING_NUMERAL_PATTERN), column, cats[column])
+
+    # 上下级编号一致：二级编号以一级的中文数字开头，三级编号的数字前部分等于二级编号
+    numeral_2 = codes['category_2'].str.extract(f'^({NUMERAL})', expand=False)
+    mismatch_2 = used & numeral_2.notna() & codes['category_1'].notna() & (numeral_2 != codes['category_1'])
+    report.add('category_2_level_mismatch', WARNING, '二级分类编号与一级分类不一致', mismatch_2, 'category_2',
+               cats['category_1'] + ' / ' + cats['category_2'])
+    mismatch_3 = (used & codes['category_3'].notna() & codes['category_2'].notna()
+                  & (codes['category_3'] != codes['category_2']))
+    report.add('category_3_level_mismatch', WARNING, '三级分类编号与二级分类不一致', mismatch_3, 'category_3',
+               cats['category_2'] + ' / ' + cats['category_3'])
+
+    # 登记表中没有的分类在生成时theme_id为NULL
+    known = pd.Index(list(theme_mapping))
+    for column in CATEGORY_COLUMNS:
+        report.add(f'{column}_unknown', ERROR, '分类不在主题登记表中，theme_id会是NULL',
+                   used & present[column] & ~cats[column].isin(known), column, cats[column])
+
+    # 粤拼：先用正则批量检查，不匹配的值再用parse_jyutping()确认，结果与expression_pronunciations.is_valid一致
+    report.add('jyutping_blank', WARNING, '粤拼为空，pronunciation_verified为false',
+               used & (jyutping == ''), 'jyutping', jyutping)
+    suspect = used & (jyutping != '') & ~jyutping.str.fullmatch(JYUTPING_VALUE_PATTERN)
+    invalid_values = {value for value in jyutping[suspect].unique()
+                      if not all(reading['is_valid'] for reading in parse_jyutping(value))}
+    report.add('jyutping_malformed', WARNING, '粤拼中有无法解析的音节，该读法的is_valid为false',
+               suspect & jyutping.isin(invalid_values), 'jyutping', jyutping)
+    return report
+
+
+def validate_csv(csv_file: str = 'Satgwong_processed.csv', registry_file: str = REGISTRY_FILE,
+                 report_file: Optional[str] = VALIDATION_REPORT_FILE) -> ValidationReport:
+    """校验词典CSV（通过解析缓存读取），写出校验报告"""
+    report = validate_frame(pd.DataFrame(load_columns(csv_file)), load_theme_mapping(registry_file), csv_file)
+    if report_file:
+        report.write(report_file)
+    return report
+
+
+def check_dictionary(csv_file: str = 'Satgwong_processed.csv', registry_file: str = REGISTRY_FILE,
+                     report_file: Optional[str] = VALIDATION_REPORT_FILE) -> ValidationReport:
+    """校验词典CSV，有错误时抛出ValueError，用于生成前的快速失败"""
+    report = validate_csv(csv_file, registry_file, report_file)
+    print(report.summary())
+    if not report.ok:
+        raise ValueError(f"词典数据校验失败: {report.count(ERROR)} 个错误，详见{report_file}")
+    return report
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='校验词典CSV，输出结构化的校验报告')
+    parser.add_argument('--csv', default='Satgwong_processed.csv', help='词典CSV文件')
+    parser.add_argument('--registry', default=REGISTRY_FILE, help='主题登记表')
+    parser.add_argument('--report', default=VALIDATION_REPORT_FILE, help='校验报告文件')
+    args = parser.parse_args()
+
+    report = validate_csv(args.csv, args.registry, args.report)
+    print(report.summary())
+    print(f"校验报告已生成：{args.report}")
+    sys.exit(0 if report.ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词条语体标记（【俗】【雅】【貶】等）的提取和expression_tags表的生成
+一次正则扫描收集meanings和note中的全部【…】标记，formality_level由标记集合推导，
+expression_tags表按标记建索引，查询时无需对definition做LIKE '%【俗】%'扫描
+"""
+
+import re
+from typing import Iterable, List
+
+from copy_export import EXPRESSION_TAGS_DDL, TAGS_COPY_FILE, TAGS_COPY_COLUMNS
+from side_tables import SideTable
+
+TAGS_SQL_FILE = 'expression_tags_insert.sql'
+
+# 【…】标记，括号内不含其他括号
+TAG_PATTERN = re.compile(r'【([^【】]+)】')
+
+# 按优先级从高到低判断正式程度，未命中任何标记时为neutral
+FORMALITY_BY_TAG = [
+    ('vulgar', frozenset(['罵', '侮'])),        # 粗俗/侮辱性语言
+    ('slang', frozenset(['俗'])),               # 俚语/俗语（包括粗话）
+    ('formal', frozenset(['雅', '敬', '婉'])),   # 正式/文雅用语
+    ('informal', frozenset(['戲', '親', '兒'])),  # 非正式用语（戏语、亲昵称呼、儿语等）
+]
+
+
+def extract_tags(text: str) -> List[str]:
+    """一次扫描提取文本中的全部【…】标记，按首次出现顺序去重"""
+    if not text:
+        return []
+    return list(dict.fromkeys(TAG_PATTERN.findall(text)))
+
+
+def formality_from_tags(tags: Iterable[str]) -> str:
+    """根据标记集合确定正式程度"""
+    tag_set = set(tags)
+    for formality, markers in FORMALITY_BY_TAG:
+        if tag_set & markers:
+            return formality
+    # 其他情况默认为中性（包括【褒】【貶】【喻】【舊】【外】【熟】【歇】等）
+    return 'neutral'
+
+
+# expression_tags表，upsert时已存在的标记跳过
+EXPRESSION_TAGS = SideTable('expression_tags', TAGS_COPY_COLUMNS, "ON CONFLICT (expression_id, tag) DO NOTHING",
+                            EXPRESSION_TAGS_DDL, TAGS_SQL_FILE, TAGS_COPY_FILE,
+                            '词条的每个【…】标记一行，按标记查询词条时走(tag, expression_id)索引')
+
+
+def tag_rows(expression_id: int, tags: Iterable[str]) -> List[List]:
+    """expression_tags表的行（列顺序见copy_export.TAGS_COPY_COLUMNS）"""
+    return [[expression_id, tag] for tag in tags]
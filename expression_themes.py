@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词条去重和expression_themes关联表的生成
+同一词条（标准化词条文本、粤拼、释义都相同）常出现在多个三级分类下，去重模式按三者的哈希分组，
+expressions只保留首次出现的一行（id为其CSV的index列），所属主题全部写入窄表expression_themes，
+按主题浏览时通过(theme_id, expression_id)索引连接，不再重复存储释义全文
+"""
+
+import hashlib
+from typing import Dict, Optional
+
+from copy_export import EXPRESSION_THEMES_DDL, EXPRESSION_THEMES_COPY_FILE, EXPRESSION_THEMES_COPY_COLUMNS
+from side_tables import SideTable
+
+EXPRESSION_THEMES_SQL_FILE = 'expression_themes_insert.sql'
+
+
+def entry_key(record: Dict) -> bytes:
+    """去重键：标准化词条文本、粤拼和释义的哈希"""
+    text = '\x1f'.join([record['text_normalized'], record['phonetic_notation'] or '', record['definition']])
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def entry_theme_id(record: Dict) -> Optional[int]:
+    """记录所属最深一级的主题ID，没有分类时为None"""
+    for field in ('theme_id_l3', 'theme_id_l2', 'theme_id_l1'):
+        if record[field] is not None:
+            return record[field]
+    return None
+
+
+# expression_themes表（去重模式），upsert时已存在的关联跳过
+EXPRESSION_THEMES = SideTable('expression_themes', EXPRESSION_THEMES_COPY_COLUMNS,
+                              "ON CONFLICT (expression_id, theme_id) DO NOTHING",
+                              EXPRESSION_THEMES_DDL, EXPRESSION_THEMES_SQL_FILE, EXPRESSION_THEMES_COPY_FILE,
+                              '去重后的词条在其每次出现所属的最深一级主题下各一行，expression_id为同一词条首次出现的行')
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+expressions表的增量SQL生成
+expressions_manifest.json按CSV的index列记录上次生成时每行内容的哈希，
+本次只为新增、修改和删除的行生成INSERT、UPDATE和DELETE语句，
+expression_tags、expression_pronunciations和expression_variants中这些词条的行先删除再按本次数据重新插入。
+增量模式下expressions.id取CSV的index值，首次运行（没有清单）时所有行都作为新增行输出。
+新清单先写入expressions_manifest.json.pending，增量SQL导入成功后用--commit-manifest确认，
+之后才作为下次对比的基准；未确认时再次运行仍与旧清单对比，不会漏掉本次的变化。
+
+python expressions_delta.py
+psql -v ON_ERROR_STOP=1 -f expressions_delta.sql && python expressions_delta.py --commit-manifest
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from dictionary_cache import load_columns, iter_records, iter_csv_rows
+from generate_expressions_sql import (transform_row, sql_literal, source_expression_id, side_table_rows,
+                                     EXPRESSION_FIELDS, SIDE_TABLES)
+from theme_registry import load_theme_mapping, REGISTRY_FILE
+
+MANIFEST_FILE = 'expressions_manifest.json'
+# 版本2的哈希包含附属表的行；版本1的清单仍可读取，其中的行都会被视为修改，附属表随之补齐
+MANIFEST_VERSION = 2
+SUPPORTED_MANIFEST_VERSIONS = (1, 2)
+PENDING_SUFFIX = '.pending'
+DELTA_SQL_FILE = 'expressions_delta.sql'
+
+# 每条语句包含的行数
+DELTA_BATCH_SIZE = 1000
+
+
+def record_hash(record: Dict, side_rows: Tuple) -> str:
+    """一条记录的内容哈希（覆盖写入数据库的所有字段和附属表的行）"""
+    payload = json.dumps([[record[field] for field in EXPRESSION_FIELDS], side_rows], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def manifest_digest(path: str = MANIFEST_FILE) -> Optional[str]:
+    """清单文件的SHA-256，文件不存在时为None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_manifest(path: str = MANIFEST_FILE) -> Dict[str, str]:
+    """读取上次确认的清单 {index: 内容哈希}，文件不存在时返回空清单"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') not in SUPPORTED_MANIFEST_VERSIONS:
+        raise ValueError(f"不支持的清单版本: {data.get('version')}")
+    return data['rows']
+
+
+def save_manifest(rows: Dict[str, str], path: str = MANIFEST_FILE, base: Optional[str] = None) -> None:
+    """写出清单；base为生成时所对比的清单文件的SHA-256，确认时用于检查基准是否已变化"""
+    data = {
+        'version': MANIFEST_VERSION,
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'base': base,
+        'rows': rows,
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def commit_manifest(path: str = MANIFEST_FILE) -> None:
+    """增量SQL导入成功后调用：把待确认的清单替换为正式清单"""
+    pending_path = path + PENDING_SUFFIX
+    if not os.path.exists(pending_path):
+        raise ValueError(f"没有待确认的清单: {pending_path}")
+    with open(pending_path, 'r', encoding='utf-8') as f:
+        base = json.load(f).get('base')
+    if base != manifest_digest(path):
+        raise ValueError(f"{path}在生成增量SQL之后已改变，请重新生成增量SQL")
+    os.replace(pending_path, path)
+
+
+def format_delta_insert(expression_id: int, record: Dict) -> str:
+    values = ', '.join(sql_literal(record[field]) for field in EXPRESSION_FIELDS)
+    return (f"INSERT INTO expressions (id, {', '.join(EXPRESSION_FIELDS)}, created_at, updated_at) "
+            f"VALUES ({expression_id}, {values}, NOW(), NOW());")
+
+
+def format_delta_update(expression_id: int, record: Dict) -> str:
+    assignments = ', '.join(f"{field} = {sql_literal(record[field])}" for field in EXPRESSION_FIELDS)
+    return f"UPDATE expressions SET {assignments}, updated_at = NOW() WHERE id = {expression_id};"
+
+
+def diff_rows(rows, theme_mapping, previous: Dict[str, str]) -> Tuple[List, List, List[int], Dict[str, str]]:
+    """对比本次数据和上次清单，返回(新增, 修改, 删除的id, 新清单)，新增和修改为(id, 记录, 附属表的行)"""
+    added = []
+    changed = []
+    current = {}
+    for row in rows:
+        record = transform_row(row, theme_mapping)
+        if record is None:
+            continue
+        index = row.get('index', '').strip()
+        expression_id = source_expression_id(index)
+        if index in current:
+            raise ValueError(f"index列存在重复值: {index}")
+        side_rows = side_table_rows(expression_id, record)
+        digest = record_hash(record, side_rows)
+        current[index] = digest
+        if index not in previous:
+            added.append((expression_id, record, side_rows))
+        elif previous[index] != digest:
+            changed.append((expression_id, record, side_rows))
+    removed = sorted(source_expression_id(index) for index in previous if index not in current)
+    return added, changed, removed, current
+
+
+def _batches(values: List, size: int = DELTA_BATCH_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def generate_delta_sql(csv_file: str = 'Satgwong_processed.csv', registry_file: str = REGISTRY_FILE,
+                       manifest_file: str = MANIFEST_FILE, output_file: str = DELTA_SQL_FILE,
+                       stream: bool = False) -> Tuple[int, int, int]:
+    """生成增量SQL和待确认的清单，返回(新增, 修改, 删除)行数
+
+    清单在增量SQL导入成功、调用commit_manifest()之后才会更新
+    """
+    theme_mapping = load_theme_mapping(registry_file)
+    previous = load_manifest(manifest_file)
+    rows = iter_csv_rows(csv_file) if stream else iter_records(load_columns(csv_file))
+    added, changed, removed, current = diff_rows(rows, theme_mapping, previous)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write("-- 自动生成的expressions表增量SQL\n")
+        f.write(f"-- 新增 {len(added)} 条，修改 {len(changed)} 条，删除 {len(removed)} 条\n")
+        f.write(f"-- 导入成功后执行 python expressions_delta.py --commit-manifest 确认清单\n\n")
+        f.write("BEGIN;\n")
+        # 修改和删除的词条在附属表中的行先全部删除，修改和新增的词条再按本次数据插入
+        stale_ids = sorted(removed + [expression_id for expression_id, _, _ in changed])
+        if stale_ids:
+            f.write("\n-- 删除修改和删除的词条在附属表中的行\n")
+            for table in SIDE_TABLES:
+                for ids in _batches(stale_ids):
+                    f.write(table.delete_sql(ids))
+        if removed:
+            f.write("\n-- 删除的词条\n")
+            for ids in _batches(removed):
+                f.write(f"DELETE FROM expressions WHERE id IN ({', '.join(str(expression_id) for expression_id in ids)});\n")
+        if changed:
+            f.write("\n-- 修改的词条\n")
+            for expression_id, record, _ in changed:
+                f.write(format_delta_update(expression_id, record) + "\n")
+        if added:
+            f.write("\n-- 新增的词条\n")
+            for expression_id, record, _ in added:
+                f.write(format_delta_insert(expression_id, record) + "\n")
+            f.write("SELECT setval('expressions_id_seq', (SELECT MAX(id) FROM expressions));\n")
+        for i, table in enumerate(SIDE_TABLES):
+            values = [table.values_sql(row) for _, _, side_rows in changed + added for row in side_rows[i]]
+            if values:
+                f.write(f"\n-- {table.name}\n")
+                for batch in _batches(values):
+                    f.write(table.insert_sql(batch))
+        f.write("\nCOMMIT;\n")
+
+    # 新清单等增量SQL导入成功后再确认，未确认时下次运行仍与旧清单对比
+    pending_file = manifest_file + PENDING_SUFFIX
+    save_manifest(current, pending_file, base=manifest_digest(manifest_file))
+    print(f"增量SQL已生成：{output_file} (新增 {len(added)} 条，修改 {len(changed)} 条，删除 {len(removed)} 条)")
+    print(f"待确认的清单已生成：{pending_file}，增量SQL导入成功后用--commit-manifest确认")
+    return len(added), len(changed), len(removed)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='生成expressions表的增量SQL')
+    parser.add_argument('--csv', default='Satgwong_processed.csv', help='词典CSV文件')
+    parser.add_argument('--manifest', default=MANIFEST_FILE, help='上次确认的清单文件')
+    parser.add_argument('--output', default=DELTA_SQL_FILE, help='增量SQL文件')
+    parser.add_argument('--stream', action='store_true', help='逐行读取CSV，不使用解析缓存')
+    parser.add_argument('--commit-manifest', action='store_true',
+                        help='增量SQL导入成功后确认清单，作为下次生成的基准')
+    args = parser.parse_args()
+    if args.commit_manifest:
+        try:
+            commit_manifest(args.manifest)
+        except ValueError as e:
+            parser.exit(1, f"确认失败: {e}\n")
+        print(f"清单已确认：{args.manifest}")
+        return
+    generate_delta_sql(csv_file=args.csv, manifest_file=args.manifest, output_file=args.output,
+                       stream=args.stream)
+
+
+if __name__ == '__main__':
+    main()
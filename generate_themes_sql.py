@@ -4,22 +4,123 @@
 生成themes表SQL插入语句的脚本
 根据Satgwong_processed.csv文件中的category_1、category_2、category_3字段
 生成相应的SQL INSERT语句来构建分类树结构
+
+增量SQL（themes_delta_insert.sql）与themes_applied.json中已导入数据库的主题状态对比生成，
+导入成功后用--commit-delta确认；确认之前每次运行都重新生成完整的增量SQL，不会因登记表已保存而丢失
+
+python generate_themes_sql.py
+psql -v ON_ERROR_STOP=1 -f themes_delta_insert.sql && python generate_themes_sql.py --commit-delta
 """
 
+import json
+import os
+from datetime import datetime
 import pandas as pd
 import re
-from typing import Dict, List, Tuple, Set
+from typing import Dict, List, Optional, Tuple, Set
+
+from dictionary_cache import load_columns, file_sha256
+from theme_registry import ThemeRegistry, REGISTRY_FILE
+from instrumentation import StageMetrics
+from copy_export import (write_copy_file, write_copy_driver, THEMES_COPY_FILE, THEME_CLOSURE_COPY_FILE,
+                         THEMES_COPY_TABLES, COPY_DRIVER_FILE, THEMES_EXTRA_COLUMNS_DDL, THEME_CLOSURE_DDL)
+from compressed_output import check_compression, compressed_filename, open_output, COMPRESSION_SUFFIXES
+
+CATEGORY_COLUMNS = ['category_1', 'category_2', 'category_3']
+
+# 嵌套集合区间和闭包表的SQL文件
+THEMES_HIERARCHY_FILE = 'themes_hierarchy.sql'
+
+# 新增和变动主题的增量SQL，与已导入的主题状态相比没有变化时不保留该文件
+THEMES_DELTA_FILE = 'themes_delta_insert.sql'
+
+# 已导入数据库的主题状态 {name: {id, level, parent_id, sort_order}}，
+# 增量SQL生成时写入themes_applied.json.pending，--commit-delta确认后替换正式文件
+THEMES_APPLIED_FILE = 'themes_applied.json'
+THEMES_APPLIED_VERSION = 1
+PENDING_SUFFIX = '.pending'
+
+# 各阶段耗时和资源统计（themes_analysis_report.txt的同目录JSON文件）
+THEMES_METRICS_FILE = 'themes_metrics.json'
+
+def file_digest(path: str) -> Optional[str]:
+    """文件的SHA-256，文件不存在时为None"""
+    return file_sha256(path) if os.path.exists(path) else None
+
+
+def load_applied_themes(path: str = THEMES_APPLIED_FILE) -> Optional[Dict[str, Dict]]:
+    """读取已导入数据库的主题状态，文件不存在时返回None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != THEMES_APPLIED_VERSION:
+        raise ValueError(f"不支持的主题状态文件版本: {data.get('version')}")
+    return data['themes']
+
+
+def save_applied_themes(themes: Dict[str, Dict], path: str = THEMES_APPLIED_FILE,
+                        base: Optional[str] = None) -> None:
+    """写出主题状态；base为生成增量SQL时所对比的状态文件的SHA-256，确认时用于检查基准是否已变化"""
+    data = {
+        'version': THEMES_APPLIED_VERSION,
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'base': base,
+        'themes': themes,
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def remove_delta_files() -> None:
+    """删除各种压缩格式的增量SQL"""
+    for suffix in [''] + list(COMPRESSION_SUFFIXES.values()):
+        if os.path.exists(THEMES_DELTA_FILE + suffix):
+            os.remove(THEMES_DELTA_FILE + suffix)
+
+
+def commit_themes_delta(applied_file: str = THEMES_APPLIED_FILE) -> None:
+    """增量SQL导入成功后调用：待确认的主题状态替换正式状态，删除已导入的增量SQL"""
+    pending_path = applied_file + PENDING_SUFFIX
+    if not os.path.exists(pending_path):
+        raise ValueError(f"没有待确认的主题状态: {pending_path}")
+    with open(pending_path, 'r', encoding='utf-8') as f:
+        base = json.load(f).get('base')
+    if base != file_digest(applied_file):
+        raise ValueError(f"{applied_file}在生成增量SQL之后已改变，请重新生成增量SQL")
+    os.replace(pending_path, applied_file)
+    remove_delta_files()
+
 
 class ThemesSQLGenerator:
-    def __init__(self, csv_file: str):
+    def __init__(self, csv_file: str, engine: str = 'columnar', registry_file: str = REGISTRY_FILE,
+                 output_format: str = 'sql', compression: str = None, write_delta: bool = True,
+                 applied_file: str = THEMES_APPLIED_FILE):
+        if engine not in ('columnar', 'rows'):
+            raise ValueError(f"未知的处理引擎: {engine}")
+        if output_format not in ('sql', 'copy'):
+            raise ValueError(f"未知的输出格式: {output_format}")
+        check_compression(compression)
         self.csv_file = csv_file
-        self.themes = {}  # 存储主题信息: {name: {id, level, parent_id, sort_order}}
-        self.id_counter = 1
+        self.engine = engine  # columnar: 按列批量处理; rows: 逐行处理（旧实现）
+        self.output_format = output_format  # sql: INSERT语句; copy: PostgreSQL COPY数据文件
+        self.compression = compression  # None: 不压缩; gzip/zstd: SQL和COPY文件边写边压缩
+        self.registry = ThemeRegistry(registry_file).load()  # 主题ID登记表，只追加
+        # 是否写出themes_delta_insert.sql；登记表已由其他步骤保存时，增量SQL也应由该步骤写出
+        self.write_delta = write_delta
+        self.applied_file = applied_file
+        # 本次运行前的登记表，还没有themes_applied.json时视为已导入数据库的状态
+        self.registered_themes = {name: self._theme_state(theme) for name, theme in self.registry.themes.items()}
+        self.themes = {}  # 存储主题信息: {name: {id, level, parent_id, sort_order, lft, rgt}}
+        self.id_counter = self.registry.next_id
         
     def load_data(self) -> pd.DataFrame:
         """加载CSV数据"""
         print(f"正在读取文件: {self.csv_file}")
-        df = pd.read_csv(self.csv_file, encoding='utf-8')
+        df = pd.DataFrame(load_columns(self.csv_file))
         print(f"共读取 {len(df)} 条记录")
         return df
     
@@ -32,8 +133,46 @@ class ThemesSQLGenerator:
         # 可以添加更多清理规则
         return name
     
+    def clean_category_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """按列批量清理三级分类名称，结果与逐个调用clean_category_name一致"""
+        cats = df[CATEGORY_COLUMNS].fillna('').astype(str)
+        cats = cats.apply(lambda col: col.str.strip())
+        return cats.reset_index(drop=True)
+    
     def extract_unique_categories(self, df: pd.DataFrame) -> Tuple[List[str], Dict[str, List[str]], Dict[str, List[str]]]:
         """提取所有唯一的分类"""
+        if self.engine == 'rows':
+            return self._extract_unique_categories_rows(df)
+        
+        cats = self.clean_category_columns(df)
+        has_1 = cats['category_1'] != ''
+        has_2 = cats['category_2'] != ''
+        has_3 = cats['category_3'] != ''
+        
+        # 一级分类，保持首次出现的顺序
+        category_1_list = cats.loc[has_1, 'category_1'].drop_duplicates().tolist()
+        category_1_to_2 = {cat1: [] for cat1 in category_1_list}
+        category_2_to_3 = {}
+        
+        # 二级分类归属于其首次出现（且一级分类非空）那一行的一级分类
+        first_2 = cats.loc[has_1 & has_2].drop_duplicates('category_2')
+        for cat1, cat2 in zip(first_2['category_1'], first_2['category_2']):
+            category_1_to_2[cat1].append(cat2)
+            category_2_to_3[cat2] = []
+        
+        # 三级分类只在其二级分类登记之后出现时才计入，与逐行处理的结果一致
+        registered_at = pd.Series(first_2.index, index=first_2['category_2'].values)
+        candidates = cats.loc[has_2 & has_3]
+        candidate_at = candidates['category_2'].map(registered_at)
+        eligible = candidates[candidate_at.notna() & (candidates.index >= candidate_at)]
+        first_3 = eligible.drop_duplicates('category_3')
+        for cat2, cat3 in zip(first_3['category_2'], first_3['category_3']):
+            category_2_to_3[cat2].append(cat3)
+        
+        return category_1_list, category_1_to_2, category_2_to_3
+    
+    def _extract_unique_categories_rows(self, df: pd.DataFrame) -> Tuple[List[str], Dict[str, List[str]], Dict[str, List[str]]]:
+        """逐行提取所有唯一的分类（旧实现，用于核对）"""
         # 一级分类
         category_1_list = []
         category_1_to_2 = {}  # category_1 -> [category_2, ...]
@@ -72,30 +211,28 @@ class ThemesSQLGenerator:
     def build_themes_structure(self, category_1_list: List[str], 
                              category_1_to_2: Dict[str, List[str]], 
                              category_2_to_3: Dict[str, List[str]]) -> None:
-        """构建主题结构"""
+        """构建主题结构，主题ID取自登记表，新主题在末尾追加ID"""
         # 处理一级分类
         for i, cat1 in enumerate(category_1_list):
             self.themes[cat1] = {
-                'id': self.id_counter,
+                'id': self.registry.register(cat1, 1, None, i + 1),
                 'name': cat1,
                 'parent_id': None,
                 'level': 1,
                 'sort_order': i + 1
             }
-            self.id_counter += 1
         
         # 处理二级分类
         for cat1, cat2_list in category_1_to_2.items():
             parent_id = self.themes[cat1]['id']
             for i, cat2 in enumerate(cat2_list):
                 self.themes[cat2] = {
-                    'id': self.id_counter,
+                    'id': self.registry.register(cat2, 2, parent_id, i + 1),
                     'name': cat2,
                     'parent_id': parent_id,
                     'level': 2,
                     'sort_order': i + 1
                 }
-                self.id_counter += 1
         
         # 处理三级分类
         for cat2, cat3_list in category_2_to_3.items():
@@ -103,13 +240,97 @@ class ThemesSQLGenerator:
                 parent_id = self.themes[cat2]['id']
                 for i, cat3 in enumerate(cat3_list):
                     self.themes[cat3] = {
-                        'id': self.id_counter,
+                        'id': self.registry.register(cat3, 3, parent_id, i + 1),
                         'name': cat3,
                         'parent_id': parent_id,
                         'level': 3,
                         'sort_order': i + 1
                     }
-                    self.id_counter += 1
+        
+        self.id_counter = self.registry.next_id
+    
+    def build_hierarchy(self) -> List[Tuple[int, int, int]]:
+        """一次深度优先遍历主题树，为每个主题写入嵌套集合区间lft/rgt，并返回闭包表行
+
+        闭包表行为(ancestor_id, descendant_id, depth)，包含每个主题自身（depth为0）；
+        同级主题按sort_order遍历，某主题的所有下级主题满足 lft < 下级.lft < rgt
+        """
+        children = {}
+        for theme_name, theme_info in self.themes.items():
+            children.setdefault(theme_info['parent_id'], []).append(
+                (theme_info['sort_order'], theme_info['id'], theme_name))
+        for siblings in children.values():
+            siblings.sort()
+        
+        closure_rows = []
+        counter = 0
+        path = []  # 当前主题及其所有上级主题的ID
+        stack = [(theme_name, False) for _, _, theme_name in reversed(children.get(None, []))]
+        while stack:
+            theme_name, finished = stack.pop()
+            theme_info = self.themes[theme_name]
+            counter += 1
+            if finished:
+                # 所有下级主题都已遍历
+                theme_info['rgt'] = counter
+                path.pop()
+                continue
+            theme_info['lft'] = counter
+            path.append(theme_info['id'])
+            for depth, ancestor_id in enumerate(reversed(path)):
+                closure_rows.append((ancestor_id, theme_info['id'], depth))
+            stack.append((theme_name, True))
+            stack.extend((child, False) for _, _, child in reversed(children.get(theme_info['id'], [])))
+        
+        return closure_rows
+    
+    def generate_hierarchy_sql(self, closure_rows: List[Tuple[int, int, int]], batch_size: int = 1000) -> str:
+        """生成写入lft/rgt和theme_closure的SQL，需先调用build_hierarchy()"""
+        sql_lines = []
+        sql_lines.append("-- 自动生成的themes层次结构：嵌套集合区间(lft, rgt)和闭包表theme_closure")
+        sql_lines.append("-- 查询某主题下的全部主题: SELECT descendant_id FROM theme_closure WHERE ancestor_id = ?")
+        sql_lines.append("-- 或: SELECT c.id FROM themes p JOIN themes c ON c.lft BETWEEN p.lft AND p.rgt WHERE p.id = ?")
+        sql_lines.append("")
+        sql_lines.append("BEGIN;")
+        sql_lines.extend(self.hierarchy_sql_lines(closure_rows, batch_size))
+        sql_lines.append("COMMIT;")
+        return '\n'.join(sql_lines) + '\n'
+    
+    def hierarchy_sql_lines(self, closure_rows: List[Tuple[int, int, int]], batch_size: int = 1000) -> List[str]:
+        """重写全部主题的lft/rgt并重建theme_closure的语句（不含事务）"""
+        sql_lines = [THEMES_EXTRA_COLUMNS_DDL]
+        
+        values = [f"  ({theme_info['id']}, {theme_info['lft']}, {theme_info['rgt']})"
+                  for theme_info in self.themes.values()]
+        if values:
+            sql_lines.append("UPDATE themes AS t")
+            sql_lines.append("SET lft = v.lft, rgt = v.rgt")
+            sql_lines.append("FROM (VALUES")
+            sql_lines.append(",\n".join(values))
+            sql_lines.append(") AS v(id, lft, rgt)")
+            sql_lines.append("WHERE t.id = v.id;")
+        
+        sql_lines.append("")
+        sql_lines.append(THEME_CLOSURE_DDL)
+        sql_lines.append("DELETE FROM theme_closure;")
+        for start in range(0, len(closure_rows), batch_size):
+            batch = closure_rows[start:start + batch_size]
+            sql_lines.append("INSERT INTO theme_closure (ancestor_id, descendant_id, depth) VALUES")
+            sql_lines.append(",\n".join(f"  ({ancestor_id}, {descendant_id}, {depth})"
+                                        for ancestor_id, descendant_id, depth in batch) + ";")
+        return sql_lines
+    
+    def themes_by_level(self) -> Dict[int, List[Tuple[str, Dict]]]:
+        """按级别分组主题，每个级别内按(parent_id, sort_order)排序"""
+        themes_by_level = {1: [], 2: [], 3: []}
+        for theme_name, theme_info in self.themes.items():
+            themes_by_level[theme_info['level']].append((theme_name, theme_info))
+        
+        # 对每个级别按sort_order排序
+        for level in [1, 2, 3]:
+            themes_by_level[level].sort(key=lambda x: (x[1]['parent_id'] or 0, x[1]['sort_order']))
+        
+        return themes_by_level
     
     def generate_sql(self) -> str:
         """生成SQL INSERT语句"""
@@ -124,28 +345,14 @@ class ThemesSQLGenerator:
         sql_lines.append("-- 插入主题分类数据")
         
         # 按照级别和排序顺序生成INSERT语句
-        themes_by_level = {1: [], 2: [], 3: []}
-        for theme_name, theme_info in self.themes.items():
-            themes_by_level[theme_info['level']].append((theme_name, theme_info))
-        
-        # 对每个级别按sort_order排序
-        for level in [1, 2, 3]:
-            themes_by_level[level].sort(key=lambda x: (x[1]['parent_id'] or 0, x[1]['sort_order']))
+        themes_by_level = self.themes_by_level()
         
         # 生成INSERT语句
         for level in [1, 2, 3]:
             if themes_by_level[level]:
                 sql_lines.append(f"\n-- {level}级分类")
                 for theme_name, theme_info in themes_by_level[level]:
-                    parent_id_str = str(theme_info['parent_id']) if theme_info['parent_id'] is not None else 'NULL'
-                    
-                    # 转义单引号
-                    escaped_name = theme_name.replace("'", "''")
-                    
-                    sql = (f"INSERT INTO themes (id, name, parent_id, level, sort_order, is_active) "
-                          f"VALUES ({theme_info['id']}, '{escaped_name}', {parent_id_str}, "
-                          f"{theme_info['level']}, {theme_info['sort_order']}, true);")
-                    sql_lines.append(sql)
+                    sql_lines.append(self.theme_insert_sql(theme_name, theme_info))
         
         sql_lines.append("")
         sql_lines.append("-- 重置序列（如果需要）")
@@ -153,8 +360,118 @@ class ThemesSQLGenerator:
         
         return '\n'.join(sql_lines)
     
+    def theme_insert_sql(self, theme_name: str, theme_info: Dict) -> str:
+        """生成单个主题的INSERT语句"""
+        parent_id_str = str(theme_info['parent_id']) if theme_info['parent_id'] is not None else 'NULL'
+        
+        # 转义单引号
+        escaped_name = theme_name.replace("'", "''")
+        
+        return (f"INSERT INTO themes (id, name, parent_id, level, sort_order, is_active) "
+                f"VALUES ({theme_info['id']}, '{escaped_name}', {parent_id_str}, "
+                f"{theme_info['level']}, {theme_info['sort_order']}, true);")
+    
+    @staticmethod
+    def _theme_state(theme_info: Dict) -> Dict:
+        return {'id': theme_info['id'], 'level': theme_info['level'], 'parent_id': theme_info['parent_id'],
+                'sort_order': theme_info.get('sort_order')}
+    
+    def unapplied_changes(self, applied: Dict[str, Dict]) -> Tuple[List[str], List[str]]:
+        """与已导入的主题状态对比，返回(新增的主题, 层级、父节点或排序变动的主题)，新增主题按先上级后下级排列"""
+        new_names = sorted((theme_name for theme_name in self.themes if theme_name not in applied),
+                           key=lambda theme_name: (self.themes[theme_name]['level'], self.themes[theme_name]['id']))
+        moved_names = [theme_name for theme_name, theme_info in self.themes.items()
+                       if theme_name in applied and applied[theme_name] != self._theme_state(theme_info)]
+        return new_names, moved_names
+    
+    def generate_delta_sql(self, closure_rows: List[Tuple[int, int, int]], new_names: List[str],
+                           moved_names: List[str]) -> str:
+        """生成尚未导入数据库的新主题的INSERT和变动主题的UPDATE语句，已有主题的ID不变，无需重新加载
+
+        新增或移动主题后lft/rgt和theme_closure随之变化，在同一事务中重写
+        """
+        sql_lines = []
+        sql_lines.append("-- 自动生成的themes表增量SQL")
+        sql_lines.append(f"-- 新增主题 {len(new_names)} 个，"
+                         f"层级、父节点或排序变动的主题 {len(moved_names)} 个，已有主题的ID保持不变")
+        sql_lines.append("-- 导入成功后执行 python generate_themes_sql.py --commit-delta 确认")
+        sql_lines.append("")
+        sql_lines.append("BEGIN;")
+        for theme_name in new_names:
+            sql_lines.append(self.theme_insert_sql(theme_name, self.themes[theme_name]))
+        
+        values = []
+        for theme_name in moved_names:
+            theme_info = self.themes[theme_name]
+            parent_id_str = str(theme_info['parent_id']) if theme_info['parent_id'] is not None else 'NULL::INTEGER'
+            values.append(f"  ({theme_info['id']}, {theme_info['level']}, {parent_id_str}, {theme_info['sort_order']})")
+        if values:
+            sql_lines.append("UPDATE themes AS t")
+            sql_lines.append("SET level = v.level, parent_id = v.parent_id, sort_order = v.sort_order")
+            sql_lines.append("FROM (VALUES")
+            sql_lines.append(",\n".join(values))
+            sql_lines.append(") AS v(id, level, parent_id, sort_order)")
+            sql_lines.append("WHERE t.id = v.id;")
+        
+        sql_lines.append(f"SELECT setval('themes_id_seq', GREATEST((SELECT MAX(id) FROM themes), {self.id_counter - 1}));")
+        sql_lines.append("")
+        sql_lines.extend(self.hierarchy_sql_lines(closure_rows))
+        sql_lines.append("COMMIT;")
+        return '\n'.join(sql_lines) + '\n'
+    
+    def write_delta_sql(self, closure_rows: List[Tuple[int, int, int]]) -> Optional[str]:
+        """与已导入的主题状态对比写出增量SQL和待确认的主题状态，返回文件名
+
+        数据库中的主题已是当前状态（上次的增量SQL已确认导入）时删除增量SQL，返回None
+        """
+        applied = load_applied_themes(self.applied_file)
+        if applied is None:
+            applied = self.registered_themes
+            save_applied_themes(applied, self.applied_file)
+            print(f"没有已导入的主题状态，以本次运行前的登记表为准: {self.applied_file}")
+        new_names, moved_names = self.unapplied_changes(applied)
+        pending_file = self.applied_file + PENDING_SUFFIX
+        remove_delta_files()
+        if not new_names and not moved_names:
+            if os.path.exists(pending_file):
+                os.remove(pending_file)
+            print("主题与已导入的状态相同，无需增量SQL")
+            return None
+        delta_filename = compressed_filename(THEMES_DELTA_FILE, self.compression)
+        with open_output(delta_filename, self.compression) as f:
+            f.write(self.generate_delta_sql(closure_rows, new_names, moved_names))
+        current = {theme_name: self._theme_state(theme_info) for theme_name, theme_info in self.themes.items()}
+        save_applied_themes(current, pending_file, base=file_digest(self.applied_file))
+        print(f"尚未导入的新增主题 {len(new_names)} 个，变动主题 {len(moved_names)} 个，增量SQL已保存: {delta_filename}，"
+              f"导入成功后用--commit-delta确认")
+        return delta_filename
+    
+    def generate_copy_rows(self, theme_counts: Dict[str, int], subtree_counts: Dict[str, int]) -> List[Tuple]:
+        """生成COPY数据行，列顺序见copy_export.THEMES_COPY_COLUMNS，词条数量直接写入"""
+        rows = []
+        themes_by_level = self.themes_by_level()
+        for level in [1, 2, 3]:
+            for theme_name, theme_info in themes_by_level[level]:
+                rows.append((theme_info['id'], theme_name, theme_info['parent_id'], theme_info['level'],
+                             theme_info['sort_order'], True, theme_counts.get(theme_name, 0),
+                             subtree_counts.get(theme_name, 0), theme_info.get('lft'), theme_info.get('rgt')))
+        return rows
+    
     def count_expressions_by_theme(self, df: pd.DataFrame) -> Dict[str, int]:
-        """统计每个主题下的词条数量"""
+        """统计每个主题下的词条数量（expression_count）
+
+        一至三级分类列分别计数，词条在其各级分类下各计一次；
+        每条词条只计入一次的含下级主题总数见count_subtree_expressions()
+        """
+        if self.engine == 'rows':
+            return self._count_expressions_by_theme_rows(df)
+        
+        cats = self.clean_category_columns(df)
+        counts = pd.concat([cats[col] for col in CATEGORY_COLUMNS], ignore_index=True).value_counts()
+        return {theme_name: int(counts.get(theme_name, 0)) for theme_name in self.themes}
+    
+    def _count_expressions_by_theme_rows(self, df: pd.DataFrame) -> Dict[str, int]:
+        """逐行统计每个主题下的词条数量（旧实现，用于核对）"""
         theme_counts = {}
         
         # 初始化计数
@@ -170,16 +487,56 @@ class ThemesSQLGenerator:
         
         return theme_counts
     
-    def generate_update_counts_sql(self, theme_counts: Dict[str, int]) -> str:
-        """生成更新expression_count的SQL语句"""
+    def count_subtree_expressions(self, df: pd.DataFrame) -> Dict[str, int]:
+        """统计每个主题及其所有下级主题的词条总数（subtree_expression_count）
+
+        每条词条归入其最具体的已知分类（优先三级，其次二级、一级），再沿parent_id逐级向上累加，
+        一级、二级主题无需递归查询即可得到其下所有词条数量
+        """
+        cats = self.clean_category_columns(df)
+        known = set(self.themes)
+        leaf = cats['category_1'].where(cats['category_1'].isin(known), '')
+        for col in ['category_2', 'category_3']:
+            leaf = cats[col].where(cats[col].isin(known), leaf)
+        direct_counts = leaf[leaf != ''].value_counts()
+        
+        subtree_counts = {theme_name: int(direct_counts.get(theme_name, 0)) for theme_name in self.themes}
+        names_by_id = {theme_info['id']: theme_name for theme_name, theme_info in self.themes.items()}
+        # 从三级到一级依次把数量累加到父主题
+        for level in [3, 2]:
+            for theme_name, theme_info in self.themes.items():
+                if theme_info['level'] == level and theme_info['parent_id'] in names_by_id:
+                    subtree_counts[names_by_id[theme_info['parent_id']]] += subtree_counts[theme_name]
+        
+        return subtree_counts
+    
+    def generate_update_counts_sql(self, theme_counts: Dict[str, int],
+                                   subtree_counts: Dict[str, int]) -> str:
+        """生成更新expression_count和subtree_expression_count的SQL语句
+
+        所有主题在一条按id关联VALUES列表的UPDATE语句中更新
+        """
         sql_lines = []
         sql_lines.append("\n-- 更新每个主题的词条数量")
+        sql_lines.append("-- expression_count: 一至三级分类中出现该主题的词条数（各级分别计数）")
+        sql_lines.append("-- subtree_expression_count: 该主题及所有下级主题的词条总数（每条词条只计入其最具体的分类）")
+        sql_lines.append("ALTER TABLE themes ADD COLUMN IF NOT EXISTS subtree_expression_count INTEGER NOT NULL DEFAULT 0;")
         
-        for theme_name, count in theme_counts.items():
-            if count > 0:
-                escaped_name = theme_name.replace("'", "''")
-                sql = f"UPDATE themes SET expression_count = {count} WHERE name = '{escaped_name}';"
-                sql_lines.append(sql)
+        values = []
+        for theme_name, theme_info in self.themes.items():
+            count = theme_counts.get(theme_name, 0)
+            subtree_count = subtree_counts.get(theme_name, 0)
+            if count > 0 or subtree_count > 0:
+                values.append(f"  ({theme_info['id']}, {count}, {subtree_count})")
+        
+        if values:
+            sql_lines.append("UPDATE themes AS t")
+            sql_lines.append("SET expression_count = v.expression_count,")
+            sql_lines.append("    subtree_expression_count = v.subtree_expression_count")
+            sql_lines.append("FROM (VALUES")
+            sql_lines.append(",\n".join(values))
+            sql_lines.append(") AS v(id, expression_count, subtree_expression_count)")
+            sql_lines.append("WHERE t.id = v.id;")
         
         return '\n'.join(sql_lines)
     
@@ -214,40 +571,82 @@ class ThemesSQLGenerator:
     
     def run(self) -> None:
         """运行主程序"""
+        metrics = StageMetrics('themes')
         try:
             # 加载数据
-            df = self.load_data()
+            with metrics.stage('load'):
+                df = self.load_data()
+            rows = len(df)
+            metrics.set_rows('load', rows)
             
             # 提取分类
             print("正在分析分类结构...")
-            category_1_list, category_1_to_2, category_2_to_3 = self.extract_unique_categories(df)
+            with metrics.stage('extract', rows):
+                category_1_list, category_1_to_2, category_2_to_3 = self.extract_unique_categories(df)
             
             # 构建主题结构
             print("正在构建主题结构...")
-            self.build_themes_structure(category_1_list, category_1_to_2, category_2_to_3)
+            with metrics.stage('build'):
+                self.build_themes_structure(category_1_list, category_1_to_2, category_2_to_3)
+                closure_rows = self.build_hierarchy()
+            metrics.set_rows('build', len(self.themes))
             
             # 统计词条数量
             print("正在统计词条数量...")
-            theme_counts = self.count_expressions_by_theme(df)
-            
-            # 生成SQL
-            print("正在生成SQL语句...")
-            sql_content = self.generate_sql()
-            sql_content += self.generate_update_counts_sql(theme_counts)
+            with metrics.stage('count', rows):
+                theme_counts = self.count_expressions_by_theme(df)
+                subtree_counts = self.count_subtree_expressions(df)
             
-            # 保存SQL文件
-            sql_filename = 'themes_insert.sql'
-            with open(sql_filename, 'w', encoding='utf-8') as f:
-                f.write(sql_content)
-            print(f"SQL文件已保存: {sql_filename}")
+            with metrics.stage('sql', len(self.themes)):
+                if self.output_format == 'copy':
+                    # 生成COPY数据文件，词条数量直接写入，无需逐条UPDATE
+                    print("正在生成COPY数据文件...")
+                    copy_filename = compressed_filename(THEMES_COPY_FILE, self.compression)
+                    row_count = write_copy_file(copy_filename, self.generate_copy_rows(theme_counts, subtree_counts),
+                                                self.compression)
+                    print(f"COPY数据文件已保存: {copy_filename} ({row_count} 条记录)")
+                    closure_filename = compressed_filename(THEME_CLOSURE_COPY_FILE, self.compression)
+                    row_count = write_copy_file(closure_filename, closure_rows, self.compression)
+                    print(f"COPY数据文件已保存: {closure_filename} ({row_count} 条记录)")
+                    write_copy_driver(THEMES_COPY_TABLES, {'themes': copy_filename, 'theme_closure': closure_filename})
+                    print(f"COPY导入脚本已保存: {COPY_DRIVER_FILE}")
+                else:
+                    # 生成SQL
+                    print("正在生成SQL语句...")
+                    sql_content = self.generate_sql()
+                    sql_content += self.generate_update_counts_sql(theme_counts, subtree_counts)
+                    
+                    # 保存SQL文件
+                    sql_filename = compressed_filename('themes_insert.sql', self.compression)
+                    with open_output(sql_filename, self.compression) as f:
+                        f.write(sql_content)
+                    print(f"SQL文件已保存: {sql_filename}")
+                    
+                    # 嵌套集合区间和闭包表单独保存，在themes_insert.sql之后执行
+                    hierarchy_filename = compressed_filename(THEMES_HIERARCHY_FILE, self.compression)
+                    with open_output(hierarchy_filename, self.compression) as f:
+                        f.write(self.generate_hierarchy_sql(closure_rows))
+                    print(f"层次结构SQL已保存: {hierarchy_filename} ({len(closure_rows)} 条闭包记录)")
+                
+                # 保存主题登记表，并为新增和变动的主题生成增量SQL
+                if self.registry.changed:
+                    self.registry.save()
+                    print(f"主题登记表已更新: {self.registry.path}")
+                if self.write_delta:
+                    self.write_delta_sql(closure_rows)
             
             # 生成报告
-            report_content = self.generate_report(category_1_list, category_1_to_2, category_2_to_3)
-            report_filename = 'themes_analysis_report.txt'
-            with open(report_filename, 'w', encoding='utf-8') as f:
-                f.write(report_content)
+            with metrics.stage('report', len(self.themes)):
+                report_content = self.generate_report(category_1_list, category_1_to_2, category_2_to_3)
+                report_filename = 'themes_analysis_report.txt'
+                with open(report_filename, 'w', encoding='utf-8') as f:
+                    f.write(report_content)
             print(f"分析报告已保存: {report_filename}")
             
+            # 保存各阶段耗时和资源统计
+            metrics.write(THEMES_METRICS_FILE)
+            print(f"阶段统计已保存: {THEMES_METRICS_FILE} ({metrics.summary()})")
+            
             # 输出统计信息
             print("\n=== 生成完成 ===")
             print(f"一级分类: {len(category_1_list)} 个")
@@ -260,11 +659,28 @@ class ThemesSQLGenerator:
             raise
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='生成themes表的SQL插入语句')
     # 设置CSV文件路径
-    csv_file = 'Satgwong_processed.csv'
+    parser.add_argument('--csv', default='Satgwong_processed.csv', help='词典CSV文件')
+    parser.add_argument('--format', choices=['sql', 'copy'], default='sql',
+                        help='输出格式：sql为INSERT语句文件，copy为PostgreSQL COPY数据文件')
+    parser.add_argument('--compress', choices=['gzip', 'zstd'], default=None,
+                        help='边生成边压缩SQL和COPY文件（zstd需要安装zstandard）')
+    parser.add_argument('--commit-delta', action='store_true',
+                        help='增量SQL导入成功后确认主题状态，并删除已导入的增量SQL')
+    args = parser.parse_args()
+    
+    if args.commit_delta:
+        try:
+            commit_themes_delta()
+        except ValueError as e:
+            parser.exit(1, f"确认失败: {e}\n")
+        print(f"主题状态已确认：{THEMES_APPLIED_FILE}")
+        return
     
     # 创建生成器并运行
-    generator = ThemesSQLGenerator(csv_file)
+    generator = ThemesSQLGenerator(args.csv, output_format=args.format, compression=args.compress)
     generator.run()
 
 if __name__ == '__main__':
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词条异体写法的展开和expression_variants表的生成
+词条中用括号注明可替换的写法：阿（亞）誰表示阿誰和亞誰，屎胐（窟、忽）表示屎胐、屎窟和屎忽；
+括号中的写法替换其前面同样字数的字（不超过前一段的字数），括号前没有字时为可有可无的部分。
+*标记和同形词编号（*哋1、*制1（掣）、籮2（腡））不属于写法，描述字形的注释括号（(𡴀𡴀下面少一橫)）也不是写法。
+每种具体写法一行，同时预先计算繁简折叠键，
+按任何一种写法或其简体字查询词条都是索引等值匹配，不需要对text做LIKE扫描。
+"""
+
+import re
+from typing import List
+
+from copy_export import VARIANTS_COPY_FILE, VARIANTS_COPY_COLUMNS, EXPRESSION_VARIANTS_DDL
+from side_tables import SideTable
+
+VARIANTS_SQL_FILE = 'expression_variants_insert.sql'
+
+# 括号中的可替换写法，全角和半角括号都有
+ALTERNATIVE_PATTERN = re.compile(r'[（(]([^（）()]*)[）)]')
+ALTERNATIVE_SEPARATOR_PATTERN = re.compile(r'[、，,]')
+# 同形词编号：末尾的数字，或括号前的数字（*制1（掣）中的1）
+HOMOGRAPH_NUMBER_PATTERN = re.compile(r'\d+(?=\s*[（(])|\d+$')
+# 描述字形的注释括号，如(𡴀𡴀下面少一橫)，不是可替换的写法
+ANNOTATION_PATTERN = re.compile(r'[（(][^（）()]*(?:上面|下面|左邊|右邊|少一|多一|加一|部首|字旁|參見)[^（）()]*[）)]')
+
+# 每个词条最多展开的写法数，防止多组括号的组合数过大
+MAX_FORMS = 32
+
+# 繁体字到简体字的对照（一对一，覆盖词典中的常用字）；折叠键只用于匹配，不用于显示
+_TRADITIONAL_PAIRS = (
+    '頭头 雞鸡 腳脚 魚鱼 聲声 爛烂 時时 豬猪 話话 風风 紙纸 馬马 車车 紅红 頸颈 邊边 亞亚 開开 濕湿 發发 髮发 執执 係系 後后',
+    '龍龙 貓猫 個个 數数 頂顶 黃黄 飛飞 蝦虾 飯饭 電电 蟲虫 機机 賣卖 買买 兩两 隻只 衹只 單单 檔档 膽胆 熱热 轉转 搵揾 烏乌',
+    '線线 對对 爺爷 乾干 無无 學学 親亲 腸肠 陣阵 諗谂 長长 絲丝 滾滚 為为 計计 鴨鸭 幾几 勢势 擔担 戲戏 籠笼 橫横 夠够 湯汤',
+    '涼凉 彈弹 當当 點点 燈灯 鐘钟 紮扎 見见 條条 鹹咸 銀银 膠胶 櫃柜 間间 聽听 緊紧 閉闭 裝装 門门 睏困 飲饮 淨净 錯错 帶带',
+    '筆笔 餅饼 樓楼 認认 斬斩 媽妈 鬚须 鬆松 鬥斗 薑姜 懶懒 醜丑 蕩荡 覺觉 針针 藥药 記记 軟软 燒烧 鐵铁 欖榄 亂乱 齊齐 驚惊',
+    '種种 鏟铲 騎骑 竇窦 關关 鑊镬 兒儿 齋斋 舊旧 圍围 凍冻 蘭兰 檯台 釘钉 欄栏 運运 識识 龜龟 師师 爐炉 癲癫 萬万 積积 霧雾',
+    '腦脑 缽钵 東东 領领 麵面 輪轮 尋寻 閒闲 攬揽 駁驳 殺杀 擺摆 蘇苏 攝摄 蘿萝 蔔卜 綠绿 籮箩 蠱蛊 雲云 塵尘 鉸铰 獨独 煙烟',
+    '菸烟 盡尽 癮瘾 輕轻 經经 脫脱 樹树 撻挞 鋪铺 擰拧 貨货 繞绕 難难 慳悭 幫帮 壽寿 襯衬 靚靓 轟轰 啞哑 廢废 監监 羅罗 書书',
+    '鴿鸽 鐸铎 罌罂 飽饱 遊游 網网 錢钱 鹽盐 釐厘 臘腊 錶表 雜杂 隨随 聞闻 傾倾 應应 纜缆 靜静 戇戆 篩筛 丟丢 揀拣 質质 趕赶',
+    '價价 闊阔 禮礼 樣样 圓圆 財财 證证 醫医 鉗钳 殼壳 來来 標标 攤摊 鏈链 斷断 氣气 過过 裡里 裏里 說说 們们 這这 麼么 嗎吗',
+    '會会 還还 沒没 讓让 從从 將将 與与 國国 歲岁 愛爱 歡欢 樂乐 嚇吓 嘩哗 問问 題题 頁页 須须 順顺 類类 願愿 顏颜 額额 飄飘',
+    '餓饿 館馆 驗验 體体 髒脏 鬧闹 鮮鲜 鳥鸟 鳳凤 鴉鸦 鵝鹅 麥麦 黨党 齒齿 腎肾 腫肿 膚肤 臉脸 蘋苹 蠔蚝 衛卫 補补 褲裤 規规',
+    '視视 觀观 訂订 許许 設设 試试 詩诗 該该 語语 誤误 調调 請请 論论 謝谢 講讲 讀读 變变 讚赞 貝贝 負负 貴贵 費费 賊贼 資资',
+    '賭赌 賺赚 購购 跡迹 蹤踪 軍军 較较 輩辈 辦办 農农 進进 遠远 遲迟 選选 鄉乡 鄰邻 醬酱 錄录 鍋锅 鎖锁 鏡镜 閃闪 陽阳 隊队',
+    '階阶 際际 險险 雖虽 雙双 離离 靈灵 響响 顧顾 養养 餘余 餵喂 鳴鸣 撈捞 實实 夾夹 細细 縮缩 攪搅 滯滞 磚砖 蟻蚁 紋纹 沖冲',
+    '鮓鲊 梘枧 掛挂 夥伙 勝胜 撓挠 矇蒙 勁劲 惡恶 詐诈 爭争 攣挛 製制 鬍胡 囉啰 嚕噜 嘍喽 嚦呖 織织 結结 給给 絕绝 統统 緣缘',
+    '練练 總总 縣县 繩绳 繪绘 續续 紀纪 約约 級级 納纳 純纯 組组 終终 紹绍 綁绑 綿绵 維维 緒绪 編编 緩缓 縫缝 繳缴 議议 護护',
+    '譯译 誰谁 課课 談谈 誠诚 誇夸 訴诉 診诊 詞词 評评 詢询 詳详 誌志 誘诱 謎谜 謊谎 謙谦 謹谨 譜谱 覽览 觸触 貪贪 貧贫 販贩',
+    '貼贴 貸贷 賀贺 賓宾 賞赏 賠赔 賴赖 贈赠 贏赢 趨趋 軌轨 軸轴 載载 輔辅 輛辆 輸输 轎轿 辭辞 遞递 遙遥 遺遗 郵邮 鄭郑 醃腌',
+    '釣钓 鈍钝 鈔钞 鈕钮 鉛铅 銅铜 銳锐 鋸锯 錘锤 鍵键 鍾钟 鎚锤 鏽锈 鑰钥 鑽钻 閂闩 閘闸 閣阁 闆板 闖闯 隱隐 雛雏 韌韧 頓顿',
+    '頗颇 頰颊 頻频 顆颗 顛颠 顯显 颱台 飼饲 飾饰 餃饺 餡馅 饅馒 駐驻 駕驾 驅驱 驕骄 驢驴 骯肮 鬱郁 魷鱿 鯉鲤 鯊鲨 鯨鲸 鰂鲗',
+    '鱔鳝 鱷鳄 鳩鸠 鴛鸳 鴦鸯 鵪鹌 鶉鹑 鷹鹰 鹼碱 麗丽 黴霉 鼴鼹 齡龄 嘆叹 嚐尝 噸吨 嚨咙 團团 園园 圖图 塊块 墳坟 壞坏 壓压',
+    '奪夺 奮奋 婦妇 嬸婶 寬宽 寶宝 專专 導导 屆届 層层 屬属 嵗岁 巖岩 幣币 廁厕 廚厨 廣广 廳厅 彎弯 徑径 復复 徵征 憂忧 懷怀',
+    '戰战 戶户 拋抛 挾挟 捨舍 掃扫 揚扬 換换 損损 搖摇 搶抢 擁拥 擇择 擊击 擠挤 擴扩 擾扰 攔拦 敗败 敵敌 斂敛 曬晒 曆历 暈晕',
+    '暫暂 曉晓 朧胧 棄弃 椏桠 楊杨 業业 榮荣 構构 槍枪 樁桩 橋桥 檢检 櫻樱 權权 歐欧 歸归 殘残 殯殡 毀毁 氈毡 汙污 決决 況况',
+    '洩泄 淚泪 淺浅 減减 渦涡 測测 湧涌 準准 溝沟 滅灭 滷卤 滿满 漁渔 漢汉 潑泼 潔洁 潛潜 澀涩 濃浓 濾滤 瀉泻 灑洒 灣湾 煉炼',
+    '煩烦 燉炖 燙烫 營营 燭烛 爾尔 牆墙 牽牵 犧牺 狀状 狹狭 狽狈 獅狮 獎奖 獵猎 獸兽 獻献 環环 瓏珑 產产 畝亩 畫画 疊叠 瘋疯',
+    '療疗 癡痴 盜盗 盞盏 盤盘 矚瞩 確确 碼码 礙碍 礦矿 祿禄 禍祸 稅税 稱称 穩稳 窮穷 竄窜 竊窃 競竞 筍笋 範范 築筑 簡简 簽签',
+    '籃篮 籌筹 粵粤 糧粮 糰团 緻致 罰罚 罷罢 聖圣 聯联 聰聪 職职 肅肃 脅胁 脹胀 膩腻 臟脏 臨临 舉举 艱艰 莊庄 華华 萊莱 葉叶',
+    '蒼苍 蓋盖 蓮莲 蔥葱 蔣蒋 薦荐 藍蓝 藝艺 蘆芦 處处 號号 蝕蚀 蝨虱 螞蚂 蠅蝇 蠟蜡 蠶蚕 術术 衝冲 複复 襪袜 覓觅 訊讯 訓训',
+    '託托 訪访 鐺铛',
+)
+FOLD_TABLE = str.maketrans({pair[0]: pair[1] for pair in ' '.join(_TRADITIONAL_PAIRS).split()})
+
+
+def strip_markers(text: str) -> str:
+    """去掉*标记、注释括号和同形词编号（末尾的以及各段括号前的）"""
+    text = ANNOTATION_PATTERN.sub('', text.replace('*', '')).strip()
+    return HOMOGRAPH_NUMBER_PATTERN.sub('', text).strip()
+
+
+def expand_variants(text: str) -> List[str]:
+    """展开词条的全部具体写法，第一种为不替换任何括号的基本写法"""
+    text = strip_markers(text)
+    if '(' not in text and '（' not in text:
+        # 绝大多数词条没有括号，只有基本写法
+        return [text] if text else []
+    forms = ['']
+    position = 0
+    for match in ALTERNATIVE_PATTERN.finditer(text):
+        segment = text[position:match.start()].strip()
+        alternatives = [alternative.strip() for alternative in ALTERNATIVE_SEPARATOR_PATTERN.split(match.group(1))
+                        if alternative.strip()]
+        expanded = []
+        for form in forms:
+            base = form + segment
+            expanded.append(base)
+            for alternative in alternatives:
+                replaced = min(len(alternative), len(segment))
+                expanded.append(base[:len(base) - replaced] + alternative)
+        forms = list(dict.fromkeys(expanded))[:MAX_FORMS]
+        position = match.end()
+    rest = text[position:].strip()
+    return [form for form in dict.fromkeys(form + rest for form in forms) if form]
+
+
+def fold_key(text: str) -> str:
+    """繁简折叠键：繁体字换成简体字、统一大小写、去除空白"""
+    return ''.join(text.translate(FOLD_TABLE).casefold().split())
+
+
+def variant_rows(expression_id: int, text: str) -> List[List]:
+    """expression_variants表的行（列顺序见copy_export.VARIANTS_COPY_COLUMNS）"""
+    return [[expression_id, number, form, fold_key(form), number == 1]
+            for number, form in enumerate(expand_variants(text), 1)]
+
+
+# upsert模式：同一词条的同一写法编号已存在时更新其余各列
+VARIANTS_UPSERT_SQL = ("ON CONFLICT (expression_id, variant) DO UPDATE SET\n"
+                       "  form = EXCLUDED.form,\n"
+                       "  folded_key = EXCLUDED.folded_key,\n"
+                       "  is_primary = EXCLUDED.is_primary")
+
+
+# expression_variants表，upsert时已存在的写法编号被更新
+EXPRESSION_VARIANTS = SideTable('expression_variants', VARIANTS_COPY_COLUMNS, VARIANTS_UPSERT_SQL,
+                                EXPRESSION_VARIANTS_DDL, VARIANTS_SQL_FILE, VARIANTS_COPY_FILE,
+                                '词条的每种具体写法一行（variant为1的是基本写法），folded_key为繁简折叠键')
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成流程的分阶段计时与资源统计
+记录每个阶段的耗时、每秒行数和内存，结果写入与分析报告同目录的JSON文件，
+用于定位夜间构建中变慢的阶段。
+ru_maxrss是进程级的历史峰值，各阶段的process_peak_rss_mb为该阶段结束时进程的累计峰值，
+最耗内存的阶段之后的阶段都会显示同一个值；需要各阶段自身的峰值时以
+python -X tracemalloc generate_expressions_sql.py 运行，每个阶段单独记录Python分配内存的峰值（peak_traced_mb），
+tracemalloc会明显拖慢运行，默认不开启
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块
+    resource = None
+
+
+def traced_peak_mb(peak: int) -> float:
+    return round(peak / (1024 * 1024), 1)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程启动以来的峰值RSS（MB），平台不支持时返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    if sys.platform == 'darwin':
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+class StageMetrics:
+    """分阶段计时
+
+    阶段可以嵌套（例如写文件阶段中逐条拉取转换结果），每个阶段只记录自身的耗时，
+    嵌套在内的阶段耗时从外层阶段中扣除；同名阶段多次进入时耗时累加。
+    tracemalloc开启时，每次进入阶段重置分配峰值，阶段的peak_traced_mb为其期间（含嵌套阶段）的最大值，
+    同名阶段多次进入时取最大值。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages = {}  # 存储阶段信息: {name: {seconds, rows, process_peak_rss_mb, peak_traced_mb}}
+        self._child_seconds = []  # 当前各层阶段中嵌套阶段的耗时
+        self._traced_peaks = []  # tracemalloc开启时当前各层阶段中已观察到的分配峰值
+        self._start = time.perf_counter()
+
+    def _stage(self, name: str) -> Dict:
+        return self.stages.setdefault(name, {'seconds': 0.0, 'rows': None, 'process_peak_rss_mb': None,
+                                             'peak_traced_mb': None})
+
+    def _enter(self) -> float:
+        self._child_seconds.append(0.0)
+        if tracemalloc.is_tracing():
+            # 重置前把外层阶段到目前为止的峰值记下
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._traced_peaks:
+                self._traced_peaks[-1] = max(self._traced_peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._traced_peaks.append(0)
+        return time.perf_counter()
+
+    def _exit(self, name: str, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        child = self._child_seconds.pop()
+        if self._child_seconds:
+            self._child_seconds[-1] += elapsed
+        stage = self._stage(name)
+        stage['seconds'] += elapsed - child
+        if tracemalloc.is_tracing() and self._traced_peaks:
+            peak = max(self._traced_peaks.pop(), tracemalloc.get_traced_memory()[1])
+            if self._traced_peaks:
+                self._traced_peaks[-1] = max(self._traced_peaks[-1], peak)
+            stage['peak_traced_mb'] = max(stage['peak_traced_mb'] or 0.0, traced_peak_mb(peak))
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None):
+        """计时一个阶段"""
+        start = self._enter()
+        try:
+            yield
+        finally:
+            self._exit(name, start)
+            if rows is not None:
+                self.set_rows(name, rows)
+            self.stages[name]['process_peak_rss_mb'] = peak_rss_mb()
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """计时从iterable取值所花的时间，并以取到的条数作为该阶段的行数"""
+        iterator = iter(iterable)
+        count = 0
+        while True:
+            start = self._enter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                self._exit(name, start)
+            count += 1
+            yield item
+        self.set_rows(name, count)
+        self.stages[name]['process_peak_rss_mb'] = peak_rss_mb()
+
+    def set_rows(self, name: str, rows: int) -> None:
+        self._stage(name)['rows'] = rows
+
+    def to_dict(self) -> Dict:
+        stages = []
+        for name, stage in self.stages.items():
+            seconds = stage['seconds']
+            rows = stage['rows']
+            stages.append({
+                'stage': name,
+                'seconds': round(seconds, 6),
+                'rows': rows,
+                'rows_per_second': round(rows / seconds, 1) if rows is not None and seconds > 0 else None,
+                # 进程启动以来的累计峰值，不是本阶段单独的峰值
+                'process_peak_rss_mb': stage['process_peak_rss_mb'],
+                # 本阶段期间Python分配内存的峰值，仅在tracemalloc开启时记录
+                'peak_traced_mb': stage['peak_traced_mb'],
+            })
+        return {
+            'name': self.name,
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'total_seconds': round(time.perf_counter() - self._start, 6),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages,
+        }
+
+    def write(self, filename: str) -> None:
+        """写入JSON格式的统计结果"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+    def summary(self) -> str:
+        """单行的阶段耗时摘要"""
+        return ', '.join(f"{name} {stage['seconds']:.3f}s" for name, stage in self.stages.items())
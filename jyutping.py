@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+粤拼（jyutping）解析和expression_pronunciations表的生成
+每个jyutping值拆分为音节的声母、韵母、声调和变调（如aa3 seoi4-2），每种读法一行，
+同时预先计算去声调键（aa seoi）和声母首字母键（as），查询读音时用索引等值匹配，
+不再对phonetic_notation做模式匹配。
+分号分隔多种读法（m2; m6）；括号中的音节是前一音节的又读（lei1 (li1)），替换后作为另一种读法
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from copy_export import PRONUNCIATIONS_COPY_FILE, PRONUNCIATIONS_COPY_COLUMNS, EXPRESSION_PRONUNCIATIONS_DDL
+from side_tables import SideTable
+
+PRONUNCIATIONS_SQL_FILE = 'expression_pronunciations_insert.sql'
+
+# upsert模式：同一词条的同一读法已存在时更新其余各列
+PRONUNCIATIONS_UPSERT_SQL = "ON CONFLICT (expression_id, reading) DO UPDATE SET\n" + ",\n".join(
+    f"  {column} = EXCLUDED.{column}" for column in (
+        'jyutping', 'syllable_count', 'initials', 'finals', 'tones', 'changed_tones',
+        'toneless_key', 'initials_key', 'is_valid'))
+
+# 声母，双字母的在前
+INITIALS = ('gw', 'kw', 'ng', 'b', 'p', 'm', 'f', 'd', 't', 'n', 'l', 'g', 'k', 'h', 'z', 'c', 's', 'j', 'w')
+
+# 韵母（粤拼方案的韵母表，另加本词典用到的oet）
+FINALS = (
+    'aa', 'aai', 'aau', 'aam', 'aan', 'aang', 'aap', 'aat', 'aak',
+    'ai', 'au', 'am', 'an', 'ang', 'ap', 'at', 'ak',
+    'e', 'ei', 'eu', 'em', 'en', 'eng', 'ep', 'et', 'ek',
+    'i', 'iu', 'im', 'in', 'ing', 'ip', 'it', 'ik',
+    'o', 'oi', 'ou', 'on', 'ong', 'ot', 'ok',
+    'oe', 'oeng', 'oet', 'oek', 'eoi', 'eon', 'eot',
+    'u', 'ui', 'un', 'ung', 'ut', 'uk',
+    'yu', 'yun', 'yut',
+)
+
+# 自成音节的鼻音（唔m4、五ng5），整个音节作为韵母
+SYLLABIC_NASALS = ('m', 'ng')
+
+
+def _alternatives(values) -> str:
+    """正则的多选一，长的在前，保证最长匹配"""
+    return '|'.join(sorted(values, key=len, reverse=True))
+
+
+# 音节：声母（可无）+ 韵母，或自成音节的鼻音；再加声调(1-6)，可带变调（4-2）。
+# 声母和韵母都须在表中，sanjan4、saazi2这类漏写声调的连写音节不能解析
+_LETTERS = rf'(?:(?:{_alternatives(INITIALS)})?(?:{_alternatives(FINALS)})|{_alternatives(SYLLABIC_NASALS)})'
+SYLLABLE_PATTERN = re.compile(rf'(?:({_alternatives(INITIALS)})?({_alternatives(FINALS)})'
+                              rf'|({_alternatives(SYLLABIC_NASALS)}))([1-6])(?:-([1-6]))?')
+# 按声调拆分连写音节（tai3sou1）时只看字母和声调，拆出的音节再逐个对照声母、韵母表
+_LOOSE_SYLLABLE = r'[a-z]+[1-6](?:-[1-6])?'
+LOOSE_SYLLABLE_PATTERN = re.compile(_LOOSE_SYLLABLE)
+SYLLABLES_PATTERN = re.compile(rf'(?:{_LOOSE_SYLLABLE})+')
+VARIANT_PATTERN = re.compile(r'^\((.*)\)$')
+
+# 整个jyutping值的格式：分号分隔的读法，读法由空白分隔的音节（可连写）和其后括号中的又读音节组成；
+# 供pandas的Series.str.fullmatch批量检查，与parse_jyutping()的is_valid判断一致
+_SYLLABLE = rf'{_LETTERS}[1-6](?:-[1-6])?'
+_TOKEN = rf'(?:(?:{_SYLLABLE})+|\({_SYLLABLE}\))'
+_READING = rf'\s*(?:{_SYLLABLE})+(?:\s+{_TOKEN})*\s*'
+JYUTPING_VALUE_PATTERN = rf'{_READING}(?:;{_READING})*'
+
+
+@lru_cache(maxsize=4096)
+def parse_syllable(token: str) -> Dict:
+    """解析一个音节，声母或韵母不在表中时声母、韵母和声调为None
+
+    没有元音的鼻音音节（m4、ng5）韵母为m/ng、声母为空字符串；
+    不同的音节只有数千个，结果按音节缓存，返回的字典为共享对象，调用方不要修改
+    """
+    match = SYLLABLE_PATTERN.fullmatch(token)
+    if not match:
+        return {'syllable': token, 'initial': None, 'final': None, 'tone': None, 'changed_tone': None}
+    initial, final, nasal, tone, changed_tone = match.groups()
+    return {
+        'syllable': token,
+        'initial': initial or '',
+        'final': final or nasal,
+        'tone': int(tone),
+        'changed_tone': int(changed_tone) if changed_tone else None,
+    }
+
+
+def split_tokens(text: str) -> List[str]:
+    """按空白拆分音节；缺少空格的连写音节（tai3sou1）按声调拆开"""
+    tokens = []
+    for token in text.split():
+        if SYLLABLE_PATTERN.fullmatch(token) is None and SYLLABLES_PATTERN.fullmatch(token):
+            tokens.extend(match.group(0) for match in LOOSE_SYLLABLE_PATTERN.finditer(token))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def reading_keys(syllables: List[Dict]) -> Dict:
+    """读法的去声调键和声母首字母键"""
+    toneless = []
+    for syllable in syllables:
+        if syllable['final'] is None:
+            toneless.append(re.sub(r'[^a-z]', '', syllable['syllable'].lower()))
+        else:
+            toneless.append(syllable['initial'] + syllable['final'])
+    return {
+        'toneless_key': ' '.join(toneless),
+        'initials_key': ''.join(letters[:1] for letters in toneless),
+    }
+
+
+def parse_jyutping(text: Optional[str]) -> List[Dict]:
+    """把jyutping值解析为读法列表: [{jyutping, syllables, toneless_key, initials_key, is_valid}]
+
+    结果按jyutping值缓存，列表中的字典为共享对象，调用方不要修改
+    """
+    if not text:
+        return []
+    return list(_parse_readings(text))
+
+
+def clear_jyutping_cache() -> None:
+    """清空音节和jyutping值的解析缓存（性能测试在每次计时前调用）"""
+    parse_syllable.cache_clear()
+    _parse_readings.cache_clear()
+
+
+@lru_cache(maxsize=65536)
+def _parse_readings(text: str) -> tuple:
+    readings = []
+    for part in text.split(';'):
+        primary = []  # 本读法的音节
+        alternatives = {}  # {音节位置: 又读音节}
+        for token in split_tokens(part):
+            variant = VARIANT_PATTERN.match(token)
+            if variant and primary:
+                alternatives[len(primary) - 1] = parse_syllable(variant.group(1))
+            else:
+                primary.append(parse_syllable(token))
+        if not primary:
+            continue
+        variants = [primary]
+        if alternatives:
+            variants.append([alternatives.get(i, syllable) for i, syllable in enumerate(primary)])
+        for syllables in variants:
+            reading = {
+                'jyutping': ' '.join(syllable['syllable'] for syllable in syllables),
+                'syllables': syllables,
+                'is_valid': all(syllable['tone'] is not None for syllable in syllables),
+            }
+            reading.update(reading_keys(syllables))
+            readings.append(reading)
+    return tuple(readings)
+
+
+def pronunciation_row(expression_id: int, reading_number: int, reading: Dict) -> List:
+    """expression_pronunciations表的一行（列顺序见copy_export.PRONUNCIATIONS_COPY_COLUMNS）"""
+    syllables = reading['syllables']
+    return [
+        expression_id, reading_number, reading['jyutping'], len(syllables),
+        [syllable['initial'] for syllable in syllables],
+        [syllable['final'] for syllable in syllables],
+        [syllable['tone'] for syllable in syllables],
+        [syllable['changed_tone'] for syllable in syllables],
+        reading['toneless_key'], reading['initials_key'], reading['is_valid'],
+    ]
+
+
+def pronunciation_rows(expression_id: int, readings: Iterable[Dict]) -> List[List]:
+    """一个词条全部读法的expression_pronunciations行，reading从1开始编号"""
+    return [pronunciation_row(expression_id, reading_number, reading)
+            for reading_number, reading in enumerate(readings, 1)]
+
+
+# expression_pronunciations表，upsert时已存在的读法被更新
+EXPRESSION_PRONUNCIATIONS = SideTable(
+    'expression_pronunciations', PRONUNCIATIONS_COPY_COLUMNS, PRONUNCIATIONS_UPSERT_SQL,
+    EXPRESSION_PRONUNCIATIONS_DDL, PRONUNCIATIONS_SQL_FILE, PRONUNCIATIONS_COPY_FILE,
+    '每种读法一行（括号中的又读另作一种读法），声母或韵母不在粤拼表中的音节各项为NULL、is_valid为false',
+    array_types={'initials': 'TEXT', 'finals': 'TEXT', 'tones': 'SMALLINT', 'changed_tones': 'SMALLINT'})
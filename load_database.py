@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+直接把themes和expressions数据加载到数据库
+不经过SQL文件，由生成器逐行产生数据，通过DB-API连接以executemany（或PostgreSQL COPY）写入。
+expressions按块分配给连接池中的多个连接并行加载，每行显式带id（CSV的index列），各块的提交顺序不影响id；
+themes先于expressions提交（theme_id_l1..l3外键）。
+本地测试可以用SQLite代替PostgreSQL: python load_database.py --sqlite satgwong.db --create-schema
+也可以用--from-copy把生成器输出的（gzip/zstd压缩的）COPY数据文件边解压边导入PostgreSQL
+"""
+
+import io
+import itertools
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple
+
+from compressed_output import open_input
+from copy_export import (copy_line, load_copy_manifest, THEMES_COPY_COLUMNS, EXPRESSIONS_COPY_COLUMNS,
+                         COPY_SOURCES, COPY_SETUP_SQL)
+from dictionary_cache import load_columns, iter_records, iter_csv_rows
+from theme_registry import REGISTRY_FILE, load_theme_mapping
+
+# SQLite替代库的表结构（仅包含生成器写入的列）
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS themes (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL,
+  parent_id INTEGER REFERENCES themes(id),
+  level INTEGER NOT NULL,
+  sort_order INTEGER NOT NULL,
+  is_active BOOLEAN NOT NULL DEFAULT 1,
+  expression_count INTEGER NOT NULL DEFAULT 0,
+  subtree_expression_count INTEGER NOT NULL DEFAULT 0,
+  lft INTEGER,
+  rgt INTEGER
+);
+CREATE TABLE IF NOT EXISTS expressions (
+  id INTEGER PRIMARY KEY,
+  theme_id_l1 INTEGER REFERENCES themes(id),
+  theme_id_l2 INTEGER REFERENCES themes(id),
+  theme_id_l3 INTEGER REFERENCES themes(id),
+  text TEXT NOT NULL,
+  text_normalized TEXT,
+  region TEXT,
+  definition TEXT,
+  usage_notes TEXT,
+  formality_level TEXT,
+  frequency TEXT,
+  phonetic_notation TEXT,
+  notation_system TEXT,
+  pronunciation_verified BOOLEAN,
+  contributor_id TEXT,
+  status TEXT,
+  created_at TIMESTAMP,
+  updated_at TIMESTAMP
+);
+"""
+
+# 显式写入id后把PostgreSQL的序列推进到最大id，之后由数据库分配的id不会冲突
+RESET_SEQUENCE_SQL = "SELECT setval('{table}_id_seq', (SELECT MAX(id) FROM {table}))"
+
+# DB-API paramstyle对应的占位符
+PLACEHOLDERS = {
+    'qmark': lambda i: '?',
+    'format': lambda i: '%s',
+    'pyformat': lambda i: '%s',
+    'numeric': lambda i: f':{i + 1}',
+}
+
+
+class ConnectionPool:
+    """固定大小的DB-API连接池"""
+
+    def __init__(self, connect: Callable, size: int = 4):
+        if size < 1:
+            raise ValueError(f"连接池大小必须为正整数: {size}")
+        self.size = size
+        self._connections = [connect() for _ in range(size)]
+        self._idle = queue.Queue()
+        for conn in self._connections:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接，用完自动归还"""
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        for conn in self._connections:
+            conn.close()
+
+
+class DatabaseLoader:
+    def __init__(self, connect: Callable, paramstyle: str = 'qmark', pool_size: int = 4,
+                 chunk_size: int = 1000, use_copy: bool = False, reset_sequences: bool = False,
+                 setup_schema: bool = False):
+        """connect为无参数、返回新DB-API连接的函数；use_copy仅适用于psycopg2连接；
+        reset_sequences为True时加载后推进themes和expressions的id序列（PostgreSQL）；
+        setup_schema为True时写入前执行copy_export.COPY_SETUP_SQL中该表的DDL，
+        为原有表结构补上lft、rgt、subtree_expression_count等列（PostgreSQL）"""
+        if paramstyle not in PLACEHOLDERS:
+            raise ValueError(f"不支持的paramstyle: {paramstyle}")
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size必须为正整数: {chunk_size}")
+        self.connect = connect
+        self.paramstyle = paramstyle
+        self.pool_size = pool_size
+        self.chunk_size = chunk_size
+        self.use_copy = use_copy
+        self.reset_sequences = reset_sequences
+        self.setup_schema = setup_schema
+        self._lock = threading.Lock()
+        self.loaded = {}  # 已加载行数: {table: rows}
+
+    def insert_sql(self, table: str, columns: Sequence[str]) -> str:
+        placeholder = PLACEHOLDERS[self.paramstyle]
+        values = ', '.join(placeholder(i) for i in range(len(columns)))
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({values})"
+
+    def write_rows(self, conn, table: str, columns: Sequence[str], rows: List[Sequence]) -> int:
+        """在一个事务中写入一批数据并提交"""
+        cursor = conn.cursor()
+        try:
+            if self.setup_schema and table in COPY_SETUP_SQL:
+                cursor.execute(COPY_SETUP_SQL[table])
+            if self.use_copy:
+                data = io.StringIO(''.join(copy_line(row) for row in rows))
+                cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", data)
+            else:
+                cursor.executemany(self.insert_sql(table, columns), rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        with self._lock:
+            self.loaded[table] = self.loaded.get(table, 0) + len(rows)
+        return len(rows)
+
+    def reset_id_sequences(self, conn, tables: Iterable[str] = ('themes', 'expressions')) -> None:
+        """推进本次加载过的表的id序列，reset_sequences为False时不做任何事"""
+        if not self.reset_sequences:
+            return
+        cursor = conn.cursor()
+        try:
+            for table in tables:
+                if table in self.loaded:
+                    cursor.execute(RESET_SEQUENCE_SQL.format(table=table))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def load_themes(self, pool: ConnectionPool, rows: List[Sequence]) -> int:
+        """themes在单个事务中按层级顺序写入，父主题先于子主题"""
+        with pool.connection() as conn:
+            return self.write_rows(conn, 'themes', THEMES_COPY_COLUMNS, rows)
+
+    def load_expressions(self, pool: ConnectionPool, rows: Iterable[Sequence]) -> int:
+        """expressions按块并行写入，每块一个事务，同时在途的块数不超过连接数的两倍"""
+        def load_chunk(chunk):
+            with pool.connection() as conn:
+                return self.write_rows(conn, 'expressions', EXPRESSIONS_COPY_COLUMNS, chunk)
+
+        total = 0
+        rows = iter(rows)
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            pending = set()
+            for chunk in iter(lambda: list(itertools.islice(rows, self.chunk_size)), []):
+                if len(pending) >= pool.size * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    total += sum(future.result() for future in done)
+                pending.add(executor.submit(load_chunk, chunk))
+            total += sum(future.result() for future in pending)
+        return total
+
+    def copy_files(self, tables: Sequence[str] = tuple(COPY_SOURCES)) -> None:
+        """按COPY_SOURCES的顺序（themes先于expressions及其附属表）导入copy_manifest.json中登记的COPY数据文件
+
+        压缩文件边解压边通过COPY FROM STDIN写入，不落地解压后的文件；仅适用于psycopg2连接
+        """
+        files = load_copy_manifest()
+        if not files:
+            print("没有已登记的COPY数据文件，请先以--format copy运行生成脚本")
+            return
+        conn = self.connect()
+        try:
+            for table, (columns, _) in COPY_SOURCES.items():
+                if table not in tables or table not in files:
+                    continue
+                filename = files[table]
+                start = time.perf_counter()
+                cursor = conn.cursor()
+                try:
+                    if table in COPY_SETUP_SQL:
+                        cursor.execute(COPY_SETUP_SQL[table])
+                    with open_input(filename) as data:
+                        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", data)
+                    count = cursor.rowcount
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+                self.loaded[table] = count
+                elapsed = time.perf_counter() - start
+                print(f"{table}已从{filename}导入: {count} 条, {elapsed:.2f} 秒")
+            self.reset_id_sequences(conn)
+        finally:
+            conn.close()
+
+    def run(self, theme_rows: List[Sequence], expression_rows: Iterable[Sequence]) -> None:
+        """先加载并提交themes，再并行加载expressions，输出每秒行数"""
+        pool = ConnectionPool(self.connect, self.pool_size)
+        try:
+            start = time.perf_counter()
+            theme_count = self.load_themes(pool, theme_rows)
+            elapsed = time.perf_counter() - start
+            print(f"themes已加载: {theme_count} 条, {elapsed:.2f} 秒, {theme_count / max(elapsed, 1e-9):.0f} 行/秒")
+
+            start = time.perf_counter()
+            expression_count = self.load_expressions(pool, expression_rows)
+            elapsed = time.perf_counter() - start
+            print(f"expressions已加载: {expression_count} 条, {elapsed:.2f} 秒, "
+                  f"{expression_count / max(elapsed, 1e-9):.0f} 行/秒 ({pool.size} 个连接)")
+            with pool.connection() as conn:
+                self.reset_id_sequences(conn)
+        finally:
+            pool.close()
+
+
+def build_theme_rows(csv_file: str, registry_file: str = REGISTRY_FILE) -> List[Tuple]:
+    """用ThemesSQLGenerator构建主题树，返回themes数据行（含词条数量）
+
+    登记表有变化时与generate_themes_sql.py一样保存并写出增量SQL，新增和变动的主题不会漏掉
+    """
+    from generate_themes_sql import ThemesSQLGenerator
+
+    generator = ThemesSQLGenerator(csv_file, registry_file=registry_file)
+    df = generator.load_data()
+    category_1_list, category_1_to_2, category_2_to_3 = generator.extract_unique_categories(df)
+    generator.build_themes_structure(category_1_list, category_1_to_2, category_2_to_3)
+    closure_rows = generator.build_hierarchy()
+    if generator.registry.changed:
+        generator.registry.save()
+    generator.write_delta_sql(closure_rows)
+    return generator.generate_copy_rows(generator.count_expressions_by_theme(df),
+                                        generator.count_subtree_expressions(df))
+
+
+def iter_expression_rows(csv_file: str, registry_file: str = REGISTRY_FILE,
+                         stream: bool = False) -> Iterator[List]:
+    """逐行生成expressions数据行，列顺序见copy_export.EXPRESSIONS_COPY_COLUMNS"""
+    from generate_expressions_sql import iter_expression_records, source_expression_id, EXPRESSION_FIELDS
+
+    theme_mapping = load_theme_mapping(registry_file)
+    rows = iter_csv_rows(csv_file) if stream else iter_records(load_columns(csv_file))
+    loaded_at = datetime.now().isoformat(sep=' ', timespec='seconds')
+    for record in iter_expression_records(rows, theme_mapping, {}):
+        yield ([source_expression_id(record['source_index'])] + [record[field] for field in EXPRESSION_FIELDS]
+               + [loaded_at, loaded_at])
+
+
+def sqlite_connector(path: str) -> Callable:
+    """返回SQLite连接函数；多个连接写同一文件时依靠busy超时排队"""
+    def connect():
+        conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        conn.execute('PRAGMA foreign_keys = ON')
+        return conn
+    return connect
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='把themes和expressions数据直接加载到数据库')
+    parser.add_argument('--csv', default='Satgwong_processed.csv', help='词典CSV文件')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--sqlite', help='SQLite数据库文件（本地测试用）')
+    target.add_argument('--dsn', help='PostgreSQL连接串（需要安装psycopg2）')
+    parser.add_argument('--create-schema', action='store_true', help='在SQLite中创建表结构')
+    parser.add_argument('--workers', type=int, default=4, help='连接池大小（并行加载的连接数）')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='每个事务加载的expressions行数')
+    parser.add_argument('--copy', action='store_true', help='使用COPY代替executemany（仅PostgreSQL）')
+    parser.add_argument('--stream', action='store_true', help='逐行读取CSV，不使用解析缓存')
+    parser.add_argument('--from-copy', action='store_true',
+                        help='导入copy_manifest.json中登记的COPY数据文件（可为.gz/.zst），仅PostgreSQL')
+    args = parser.parse_args()
+
+    if args.sqlite:
+        if args.copy or args.from_copy:
+            parser.error('--copy和--from-copy仅适用于PostgreSQL')
+        connect = sqlite_connector(args.sqlite)
+        paramstyle = sqlite3.paramstyle
+        if args.create_schema:
+            conn = connect()
+            conn.executescript(SQLITE_SCHEMA)
+            conn.close()
+    else:
+        try:
+            import psycopg2
+        except ImportError:
+            parser.error('加载到PostgreSQL需要安装psycopg2')
+        connect = lambda: psycopg2.connect(args.dsn)
+        paramstyle = psycopg2.paramstyle
+
+    loader = DatabaseLoader(connect, paramstyle=paramstyle, pool_size=args.workers,
+                            chunk_size=args.chunk_size, use_copy=args.copy, reset_sequences=args.dsn is not None,
+                            setup_schema=args.dsn is not None)
+    if args.from_copy:
+        loader.copy_files()
+        return
+    loader.run(build_theme_rows(args.csv), iter_expression_rows(args.csv, stream=args.stream))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内的词条检索索引
+对标准化后的词条文本（text_normalized）和释义（meanings）建立单字和双字（bigram）倒排索引，
+查询时先求各字组倒排表的交集，再校验子串并排序，不需要数据库，也不需要逐行扫描DataFrame。
+索引由generate_sql()处理的同一批记录构建（跳过没有词条文本的行）。
+
+from search_index import build_search_index
+index = build_search_index('Satgwong_processed.csv')
+index.search('食飯')
+"""
+
+import heapq
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from dictionary_cache import load_columns, iter_records, iter_csv_rows
+from generate_expressions_sql import transform_row, normalize_text, source_expression_id
+
+WORDS = 'words'
+MEANINGS = 'meanings'
+
+# 命中位置的基础分：词条完全相同 > 词条前缀 > 词条包含 > 释义包含
+SCORE_EXACT = 100
+SCORE_PREFIX = 80
+SCORE_WORDS = 60
+SCORE_MEANINGS = 40
+
+
+def search_key(text: Optional[str]) -> str:
+    """检索用的键：标准化后去除全部空白并统一大小写"""
+    return ''.join(normalize_text(text).split()).casefold()
+
+
+def key_grams(key: str) -> List[str]:
+    """查询键拆成的字组：单字查询用单字，否则用全部双字组"""
+    if len(key) < 2:
+        return [key] if key else []
+    return list({key[i:i + 2] for i in range(len(key) - 1)})
+
+
+class SearchIndex:
+    def __init__(self):
+        self.expression_ids = []  # 文档编号 -> expressions.id
+        self.texts = []  # 文档编号 -> 词条原文
+        self.keys = {WORDS: [], MEANINGS: []}  # 文档编号 -> 检索键
+        self.postings = {WORDS: defaultdict(list), MEANINGS: defaultdict(list)}  # {字组: [文档编号, ...]}，编号递增
+
+    def __len__(self) -> int:
+        return len(self.expression_ids)
+
+    def _index_key(self, field: str, doc: int, key: str) -> None:
+        postings = self.postings[field]
+        # 单字和双字都建索引，单字查询也能走倒排表
+        grams = set(key)
+        grams.update(map(str.__add__, key, key[1:]))
+        for gram in grams:
+            postings[gram].append(doc)
+
+    def add(self, expression_id: int, text: str, meanings: str) -> None:
+        """加入一条词条"""
+        doc = len(self.expression_ids)
+        self.expression_ids.append(expression_id)
+        self.texts.append(text)
+        for field, value in ((WORDS, text), (MEANINGS, meanings)):
+            key = search_key(value)
+            self.keys[field].append(key)
+            self._index_key(field, doc, key)
+
+    def add_records(self, records: Iterable[Dict]) -> int:
+        """加入transform_row()产生的记录，返回加入的条数"""
+        count = 0
+        for record in records:
+            self.add(source_expression_id(record['source_index']), record['text'], record['definition'])
+            count += 1
+        return count
+
+    def _candidates(self, field: str, grams: List[str]) -> List[int]:
+        """包含全部字组的文档，从最短的倒排表开始求交集"""
+        postings = self.postings[field]
+        lists = []
+        for gram in grams:
+            docs = postings.get(gram)
+            if not docs:
+                return []
+            lists.append(docs)
+        lists.sort(key=len)
+        candidates = lists[0]
+        if len(lists) > 1:
+            selected = set(candidates)
+            for docs in lists[1:]:
+                selected.intersection_update(docs)
+                if not selected:
+                    return []
+            candidates = sorted(selected)
+        return candidates
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Dict]:
+        """返回按相关度排序的命中结果: [{expression_id, text, field, score}]
+
+        每条词条只出现一次，取词条和释义中得分较高的命中；同分时词条较短、CSV中靠前的优先
+        """
+        key = search_key(query)
+        grams = key_grams(key)
+        if not grams:
+            return []
+
+        texts = self.texts
+        hits = []  # (得分, 命中字段, 文档编号)
+        words_keys = self.keys[WORDS]
+        for doc in self._candidates(WORDS, grams):
+            words_key = words_keys[doc]
+            if words_key == key:
+                hits.append((SCORE_EXACT, WORDS, doc))
+            elif words_key.startswith(key):
+                hits.append((SCORE_PREFIX, WORDS, doc))
+            elif key in words_key:
+                hits.append((SCORE_WORDS, WORDS, doc))
+        hits.sort(key=lambda hit: (-hit[0], len(texts[hit[2]]), hit[2]))
+
+        # 释义命中排在所有词条命中之后，只在结果数不足时查找，且只取需要的条数
+        remaining = None if limit is None else limit - len(hits)
+        if remaining is None or remaining > 0:
+            matched = {hit[2] for hit in hits}
+            meanings_keys = self.keys[MEANINGS]
+            docs = [doc for doc in self._candidates(MEANINGS, grams)
+                    if doc not in matched and key in meanings_keys[doc]]
+            if remaining is None:
+                docs.sort(key=lambda doc: (len(texts[doc]), doc))
+            else:
+                docs = heapq.nsmallest(remaining, docs, key=lambda doc: (len(texts[doc]), doc))
+            hits.extend((SCORE_MEANINGS, MEANINGS, doc) for doc in docs)
+        elif limit is not None:
+            del hits[limit:]
+
+        return [{
+            'expression_id': self.expression_ids[doc],
+            'text': texts[doc],
+            'field': field,
+            'score': score,
+        } for score, field, doc in hits]
+
+
+def build_search_index(csv_file: str = 'Satgwong_processed.csv', stream: bool = False) -> SearchIndex:
+    """从词典CSV构建检索索引，stream为True时逐行读取CSV而不经过解析缓存"""
+    rows = iter_csv_rows(csv_file) if stream else iter_records(load_columns(csv_file))
+    index = SearchIndex()
+    # 主题ID与检索无关，不需要主题登记表
+    index.add_records(record for record in (transform_row(row, {}) for row in rows) if record is not None)
+    return index
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='在词典中检索词条和释义')
+    parser.add_argument('queries', nargs='+', help='检索词')
+    parser.add_argument('--csv', default='Satgwong_processed.csv', help='词典CSV文件')
+    parser.add_argument('--limit', type=int, default=10, help='每个检索词最多显示的结果数')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_search_index(args.csv)
+    print(f"索引已建立: {len(index)} 条词条, {time.perf_counter() - start:.2f} 秒")
+    for query in args.queries:
+        start = time.perf_counter()
+        hits = index.search(query, args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n{query}: {len(hits)} 条结果 ({elapsed:.3f} 毫秒)")
+        for hit in hits:
+            print(f"  [{hit['expression_id']}] {hit['text']} ({hit['field']}, {hit['score']})")
+
+
+if __name__ == '__main__':
+    main()
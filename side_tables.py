@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+expressions附属表（expression_tags、expression_pronunciations、expression_themes、expression_variants）的写出
+各附属表都以expression_id引用expressions.id（CSV的index列），随expressions的生成逐个词条写出，
+sql格式为带建表语句的批量INSERT文件，copy格式为COPY数据文件（列顺序见copy_export中的*_COPY_COLUMNS）。
+upsert模式下每batch_size个词条一个事务，先删除这些词条在本表中的全部行再重新插入，
+词条失去的标记、读法、写法或主题不会残留，文件可重复导入
+"""
+
+from typing import Dict, Iterable, Optional, Sequence
+
+from compressed_output import compressed_filename, open_output
+from copy_export import copy_line
+
+
+def sql_array(values: Iterable, element_type: str) -> str:
+    """SQL数组字面量，如ARRAY['s', 'g']::TEXT[]"""
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append('NULL')
+        elif isinstance(value, int):
+            elements.append(str(value))
+        else:
+            elements.append("'" + value.replace("'", "''") + "'")
+    return f"ARRAY[{', '.join(elements)}]::{element_type}[]"
+
+
+def copy_array(values: Iterable) -> str:
+    """COPY text格式中的数组字面量，元素均为小写字母、数字或空字符串"""
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append('NULL')
+        elif value == '':
+            elements.append('""')
+        else:
+            elements.append(str(value))
+    return '{' + ','.join(elements) + '}'
+
+
+def sql_value(value) -> str:
+    """附属表中标量值的SQL字面量"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, int):
+        return str(value)
+    return "'" + value.replace("'", "''") + "'"
+
+
+class SideTable:
+    """一张附属表的结构：表名、列顺序（第一列为expression_id）、upsert时的ON CONFLICT子句、建表语句和输出文件名
+
+    description写在sql文件头部，说明表中每行的含义；array_types为数组列的元素类型 {列名: 类型}
+    """
+
+    def __init__(self, name: str, columns: Sequence[str], conflict: str, ddl: str, sql_file: str,
+                 copy_file: str, description: str, array_types: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.columns = list(columns)
+        self.conflict = conflict
+        self.ddl = ddl
+        self.sql_file = sql_file
+        self.copy_file = copy_file
+        self.description = description
+        array_types = array_types or {}
+        self.array_types = [array_types.get(column) for column in self.columns]
+
+    def output_file(self, output_format: str = 'sql', compression: Optional[str] = None) -> str:
+        """生成的文件名：copy格式为COPY数据文件，否则为sql文件"""
+        return compressed_filename(self.copy_file if output_format == 'copy' else self.sql_file, compression)
+
+    def values_sql(self, row: Sequence) -> str:
+        """一行在INSERT语句中的VALUES部分"""
+        values = [sql_array(value, array_type) if array_type else sql_value(value)
+                  for value, array_type in zip(row, self.array_types)]
+        return f"({', '.join(values)})"
+
+    def copy_line(self, row: Sequence) -> str:
+        """一行COPY数据"""
+        return copy_line([copy_array(value) if array_type else value
+                          for value, array_type in zip(row, self.array_types)])
+
+    def insert_sql(self, values_list: Sequence[str], upsert: bool = False) -> str:
+        """把若干行VALUES合并为一条INSERT语句，upsert为True时带ON CONFLICT子句"""
+        conflict = "\n" + self.conflict if upsert else ""
+        return (f"INSERT INTO {self.name} ({', '.join(self.columns)}) VALUES\n"
+                + ",\n".join(values_list) + conflict + ";\n")
+
+    def delete_sql(self, expression_ids: Iterable[int]) -> str:
+        ids = ', '.join(str(expression_id) for expression_id in expression_ids)
+        return f"DELETE FROM {self.name} WHERE expression_id IN ({ids});\n"
+
+
+class SideTableWriter:
+    """边生成边写出一张附属表，sql格式为批量INSERT，copy格式为COPY数据行"""
+
+    def __init__(self, table: SideTable, output_format: str = 'sql', batch_size: int = 1000,
+                 compression: Optional[str] = None, upsert: bool = False):
+        self.table = table
+        self.output_format = output_format
+        self.upsert = upsert
+        self.batch_size = batch_size
+        self.filename = table.output_file(output_format, compression)
+        self.count = 0
+        self._pending = []
+        self._expression_ids = []  # upsert模式下当前事务中的词条
+        self._file = open_output(self.filename, compression, newline='\n')
+        if output_format != 'copy':
+            self._file.write(f"-- 自动生成的{table.name}表INSERT语句\n")
+            self._file.write(f"-- {table.description}\n")
+            self._file.write("-- expression_id引用expressions.id，须在expressions导入之后执行\n")
+            if upsert:
+                self._file.write(f"-- 每{batch_size}个词条一个事务，先删除这些词条的全部行再重新插入，本文件可重复导入\n")
+            self._file.write("\n" + table.ddl + "\n\n")
+            if not upsert:
+                self._file.write("BEGIN;\n")
+
+    def add(self, expression_id: int, rows: Iterable[Sequence]) -> None:
+        """写出一个词条在本表中的全部行；upsert模式下没有行的词条也要加入，以删除其原有的行"""
+        if self.upsert and self.output_format != 'copy':
+            self._expression_ids.append(expression_id)
+        for row in rows:
+            self.count += 1
+            if self.output_format == 'copy':
+                self._file.write(self.table.copy_line(row))
+                continue
+            self._pending.append(self.table.values_sql(row))
+            if not self.upsert and len(self._pending) >= self.batch_size:
+                self._flush()
+        if len(self._expression_ids) >= self.batch_size:
+            self._flush_upsert()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._file.write(self.table.insert_sql(self._pending, self.upsert))
+            self._pending = []
+
+    def _flush_upsert(self) -> None:
+        """一个事务：删除当前词条在本表中的行，再插入本次生成的行"""
+        if self._expression_ids:
+            self._file.write("BEGIN;\n" + self.table.delete_sql(self._expression_ids))
+            self._flush()
+            self._file.write("COMMIT;\n")
+            self._expression_ids = []
+
+    def close(self) -> None:
+        if self.output_format != 'copy':
+            if self.upsert:
+                self._flush_upsert()
+            else:
+                self._flush()
+                self._file.write("COMMIT;\n")
+        self._file.close()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+expressions_insert_partNNN.sql分卷文件的写出
+按行数（默认每卷1000行）或按字节预算分卷，每卷是一个BEGIN/COMMIT事务；
+分卷内容在主线程中拼装，写盘和SHA-256计算交给线程池并发完成，
+最后生成清单，列出每卷的行范围、字节数和SHA-256，供下游加载前并行分配和校验。
+upsert模式下每条语句带ON CONFLICT (id) DO UPDATE，分卷可以按任意顺序、并行、重复导入，
+导入失败时从失败的分卷重新开始即可，不需要先清空表
+"""
+
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from compressed_output import check_compression, compressed_filename, wrap_binary_output
+
+PART_FILENAME = 'expressions_insert_part{:03d}.sql'
+PARTS_MANIFEST_FILE = 'expressions_parts_manifest.json'
+
+# 分卷显式写入id（CSV的index列），提交前把序列推进到已有的最大id之后；
+# last_value不受事务隔离影响，并行导入的分卷不会把序列调小
+PART_FOOTER = ("\n-- 推进id序列\n"
+               "SELECT setval('expressions_id_seq', GREATEST(last_value, (SELECT MAX(id) FROM expressions))) "
+               "FROM expressions_id_seq;\n"
+               "\n-- 提交事务\nCOMMIT;\n")
+
+
+def part_header(part_number: int, upsert: bool = False) -> str:
+    """分卷文件头部，只在第一卷中写入（注释掉的）删除语句；upsert分卷可重复导入，不需要删除"""
+    header = "-- 自动生成的expressions表INSERT语句\n"
+    header += f"-- 基于Satgwong_processed.csv文件 (第{part_number}部分)\n\n"
+    if upsert:
+        header += "-- id为CSV的index列，已存在的记录会被更新，本文件可重复导入\n\n"
+    header += "-- 开始事务\n"
+    header += "BEGIN;\n\n"
+    if part_number == 1 and not upsert:
+        header += "-- 清空现有数据（可选，谨慎使用）\n"
+        header += "-- DELETE FROM expressions;\n\n"
+    header += "-- 插入expressions数据\n"
+    return header
+
+
+class _DigestFile:
+    """写入时累计字节数和SHA-256的文件"""
+
+    def __init__(self, file):
+        self._file = file
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._file.write(data)
+        self.digest.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def write_part_file(filename: str, chunks: List[bytes], compression: Optional[str] = None) -> Dict:
+    """写入（并压缩）一个分卷，返回写入磁盘的字节数和SHA-256"""
+    digest_file = _DigestFile(open(filename, 'wb'))
+    f = wrap_binary_output(digest_file, compression)
+    try:
+        for chunk in chunks:
+            f.write(chunk)
+    finally:
+        f.close()
+    return {'bytes': digest_file.size, 'sha256': digest_file.digest.hexdigest()}
+
+
+def load_part_files(manifest_file: str = PARTS_MANIFEST_FILE) -> List[str]:
+    """上次生成的分卷文件名（按分卷顺序），清单不存在时为空列表"""
+    if not os.path.exists(manifest_file):
+        return []
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return [part['file'] for part in json.load(f)['parts']]
+
+
+class SQLPartWriter:
+    def __init__(self, format_statement: Callable[[List[str]], str], batch_size: int = 1,
+                 max_rows_per_file: Optional[int] = 1000, max_bytes_per_file: Optional[int] = None,
+                 write_workers: int = 1, manifest_file: Optional[str] = PARTS_MANIFEST_FILE,
+                 compression: Optional[str] = None, upsert: bool = False):
+        """format_statement把一批VALUES转换为一条INSERT语句
+
+        指定max_bytes_per_file时按字节预算分卷（不再按行数），一卷至少包含一条语句；
+        write_workers为并发写盘的线程数；compression为gzip或zstd时分卷在写盘线程中压缩，
+        字节预算按压缩前的大小计算，清单中的字节数和SHA-256按压缩后的文件计算；
+        upsert为True时format_statement应生成ON CONFLICT语句
+        """
+        if max_bytes_per_file is None and not max_rows_per_file:
+            raise ValueError("必须指定每卷的行数或字节预算")
+        check_compression(compression)
+        self.compression = compression
+        self.format_statement = format_statement
+        self.batch_size = batch_size
+        self.max_rows = None if max_bytes_per_file else max_rows_per_file
+        self.max_bytes = max_bytes_per_file
+        self.write_workers = write_workers
+        self.manifest_file = manifest_file
+        self.upsert = upsert
+        self.footer = PART_FOOTER.encode('utf-8')
+        self.parts = []  # 已关闭的分卷: {file, part, first_row, last_row, rows}
+        self._futures = []  # 与parts一一对应的写盘任务
+        self._in_flight = deque()
+        self._current = None
+        self._pending = []
+        self._row_number = 0
+
+    def _open_part(self) -> None:
+        number = len(self.parts) + 1
+        header = part_header(number, self.upsert).encode('utf-8')
+        self._current = {
+            'file': compressed_filename(PART_FILENAME.format(number), self.compression),
+            'part': number,
+            'first_row': None,
+            'last_row': None,
+            'rows': 0,
+            'chunks': [header],
+            'bytes': len(header),
+        }
+
+    def _close_part(self, executor: ThreadPoolExecutor) -> None:
+        part = self._current
+        self._current = None
+        chunks = part.pop('chunks')
+        chunks.append(self.footer)
+        del part['bytes']
+        self.parts.append(part)
+        future = executor.submit(write_part_file, part['file'], chunks, self.compression)
+        self._futures.append(future)
+        self._in_flight.append(future)
+        # 在途的分卷数不超过线程数的两倍，限制内存占用
+        while len(self._in_flight) > self.write_workers * 2:
+            self._in_flight.popleft().result()
+        print(f"SQL文件已生成：{part['file']} ({part['rows']} 条记录)")
+
+    def _emit(self, executor: ThreadPoolExecutor) -> None:
+        """把当前批次写成一条语句放入当前分卷，超出字节预算时先换卷"""
+        batch = self._pending
+        self._pending = []
+        data = (self.format_statement(batch) + "\n").encode('utf-8')
+        part = self._current
+        if (self.max_bytes and part['rows']
+                and part['bytes'] + len(data) + len(self.footer) > self.max_bytes):
+            self._close_part(executor)
+            self._open_part()
+            part = self._current
+        last_row = self._row_number
+        if part['first_row'] is None:
+            part['first_row'] = last_row - len(batch) + 1
+        part['last_row'] = last_row
+        part['rows'] += len(batch)
+        part['chunks'].append(data)
+        part['bytes'] += len(data)
+
+    def write(self, values_list: Iterable[str]) -> int:
+        """写出全部分卷和清单，返回写入的行数"""
+        with ThreadPoolExecutor(max_workers=self.write_workers) as executor:
+            for values in values_list:
+                # 按行数分卷时，检查是否需要创建新文件
+                if self._current is None or (
+                        self.max_rows and self._current['rows'] + len(self._pending) >= self.max_rows):
+                    if self._current is not None:
+                        if self._pending:
+                            self._emit(executor)
+                        self._close_part(executor)
+                    self._open_part()
+
+                # 凑满一批后写入SQL语句
+                self._row_number += 1
+                self._pending.append(values)
+                if len(self._pending) >= self.batch_size:
+                    self._emit(executor)
+
+            # 关闭最后一个文件
+            if self._current is not None:
+                if self._pending:
+                    self._emit(executor)
+                self._close_part(executor)
+
+            # 按分卷顺序补上字节数和SHA-256
+            for part, future in zip(self.parts, self._futures):
+                part.update(future.result())
+        print(f"总共生成了 {len(self.parts)} 个SQL文件")
+        if self.manifest_file:
+            self.remove_stale_parts()
+            self.write_manifest()
+        return self._row_number
+
+    def remove_stale_parts(self) -> None:
+        """删除上次清单中登记、本次没有再生成的分卷（分卷数减少或压缩格式改变时），避免按通配符导入时混入旧数据"""
+        current = {part['file'] for part in self.parts}
+        for filename in load_part_files(self.manifest_file):
+            if filename not in current and os.path.exists(filename):
+                os.remove(filename)
+                print(f"已删除上次生成的分卷：{filename}")
+
+    def write_manifest(self) -> None:
+        data = {
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'total_rows': self._row_number,
+            'compression': self.compression,
+            'upsert': self.upsert,
+            'parts': self.parts,
+        }
+        with open(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"分卷清单已生成：{self.manifest_file}")
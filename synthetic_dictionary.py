@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成与Satgwong_processed.csv结构相同的合成词典CSV，用于性能测试
+8列（index, words, jyutping, meanings, note, category_1..3），三级分类，粤拼注音，
+meanings中含│分隔的例句、【…】标记、引号和反斜杠等需要转义的字符
+"""
+
+import csv
+import random
+from typing import Iterator, List, Tuple
+
+CSV_COLUMNS = ['index', 'words', 'jyutping', 'meanings', 'note', 'category_1', 'category_2', 'category_3']
+
+NUMERALS = ['一', '二', '三', '四', '五', '六', '七', '八', '九', '十', '十一']
+LETTERS = 'ABCDEFGHIJ'
+TAGS = ['喻', '貶', '謔', '外', '俗', '熟', '舊', '褒', '敬', '婉', '詈', '昵', '兒', '雅', '歇']
+INITIALS = ['', 'b', 'p', 'm', 'f', 'd', 't', 'n', 'l', 'g', 'k', 'ng', 'h', 'gw', 'kw', 'w', 'z', 'c', 's', 'j']
+FINALS = ['aa', 'aai', 'aau', 'aam', 'aan', 'aang', 'ai', 'au', 'am', 'an', 'ang', 'e', 'ei', 'eng',
+          'i', 'iu', 'im', 'in', 'ing', 'o', 'oi', 'ou', 'on', 'ong', 'u', 'ui', 'un', 'ung',
+          'oe', 'oeng', 'eoi', 'eon', 'yu', 'yun']
+# 常用汉字区间内的字符，用于拼出词条和释义
+CHARS = [chr(code) for code in range(0x4E00, 0x9FA6)]
+
+
+def build_categories(rng: random.Random) -> List[Tuple[str, str, str]]:
+    """生成约500个三级分类，返回(category_1, category_2, category_3)列表"""
+    categories = []
+    for numeral in NUMERALS:
+        cat1 = f"{numeral}、類別{numeral}"
+        for letter in LETTERS[:rng.randint(3, 6)]:
+            cat2 = f"{numeral}{letter}分類{letter}"
+            for n in range(1, rng.randint(5, 14)):
+                categories.append((cat1, cat2, f"{numeral}{letter}{n}細類{n}"))
+    return categories
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choices(CHARS, k=length))
+
+
+def random_jyutping(rng: random.Random, syllables: int) -> str:
+    parts = []
+    for _ in range(syllables):
+        syllable = f"{rng.choice(INITIALS)}{rng.choice(FINALS)}{rng.randint(1, 6)}"
+        if rng.random() < 0.05:
+            syllable += f"-{rng.choice([1, 2])}"  # 变调
+        parts.append(syllable)
+    return ' '.join(parts)
+
+
+def iter_rows(rows: int, seed: int = 0) -> Iterator[List]:
+    """按分类顺序逐行生成合成数据"""
+    rng = random.Random(seed)
+    categories = build_categories(rng)
+    per_category = max(1, rows // len(categories))
+    for index in range(1, rows + 1):
+        cat1, cat2, cat3 = categories[min((index - 1) // per_category, len(categories) - 1)]
+        syllables = rng.randint(1, 4)
+        words = random_text(rng, syllables)
+        if rng.random() < 0.03:
+            words = f"{words[:1]}（{random_text(rng, 1)}）{words[1:]}"
+        if rng.random() < 0.02:
+            words = f"*{words}{rng.randint(1, 3)}"
+        jyutping = '' if rng.random() < 0.01 else random_jyutping(rng, syllables)
+
+        meanings = random_text(rng, rng.randint(2, 12)) + '。'
+        if rng.random() < 0.3:
+            meanings = f"【{rng.choice(TAGS)}】{meanings}"
+        examples = [f"{random_text(rng, rng.randint(4, 16))}～。（{random_text(rng, rng.randint(4, 16))}。）"
+                    for _ in range(rng.randint(0, 3))]
+        if examples:
+            meanings += '│'.join(examples)
+        if rng.random() < 0.02:
+            meanings += "“引號”'單引號'\\反斜杠"
+        note = ''
+        if rng.random() < 0.1:
+            note = f"[{random_text(rng, rng.randint(5, 30))}]"
+            if rng.random() < 0.1:
+                note += "\n第二行"
+        yield [index, words, jyutping, meanings, note, cat1, cat2, cat3]
+
+
+def write_synthetic_csv(filename: str, rows: int, seed: int = 0) -> None:
+    """写入合成词典CSV（UTF-8带BOM，与原始数据一致）"""
+    with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows(iter_rows(rows, seed))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='生成合成词典CSV')
+    parser.add_argument('output', help='输出CSV文件')
+    parser.add_argument('--rows', type=int, default=10000, help='行数（默认10000）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+    write_synthetic_csv(args.output, args.rows, args.seed)
+    print(f"合成词典已生成: {args.output} ({args.rows} 条记录)")
+
+
+if __name__ == '__main__':
+    main()
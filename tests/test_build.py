@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import pytest
+
+from build import BuildError, BuildState, Stage, build_stages, run_graph
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(REPO_DIR, 'Satgwong_processed.csv'), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def run_build(**kwargs):
+    return run_graph(build_stages(**kwargs), BuildState(), jobs=2)
+
+
+def test_unchanged_rebuild_skips_every_stage(workdir):
+    # 没有登记表时theme_tree会写出登记表，第二次运行不应因此重新执行
+    first = run_build()
+    assert set(first.values()) == {'built'}
+    second = run_build()
+    assert second == {name: 'skipped' for name in first}
+
+
+def test_missing_output_rebuilds_stage(workdir):
+    run_build(output_format='copy', snapshot=False)
+    os.remove('expression_variants_copy.tsv')
+    results = run_build(output_format='copy', snapshot=False)
+    assert results['expressions'] == 'built'
+    assert results['theme_sql'] == 'skipped'
+
+
+def test_stage_failure_is_reported_as_build_error(workdir):
+    def broken():
+        raise KeyError('category_1')
+
+    stages = [Stage('first', lambda: None), Stage('broken', broken, deps=['first']),
+              Stage('after', lambda: None, deps=['broken'])]
+    with pytest.raises(BuildError) as info:
+        run_graph(stages, BuildState(), jobs=2)
+    assert info.value.stage == 'broken'
+    assert isinstance(info.value.__cause__, KeyError)
+    assert info.value.results == {'first': 'built'}
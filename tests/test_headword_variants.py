@@ -0,0 +1,35 @@
+import pytest
+
+from headword_variants import expand_variants, variant_rows
+
+
+@pytest.mark.parametrize('text, forms', [
+    ('阿（亞）誰', ['阿誰', '亞誰']),
+    ('屎胐（窟、忽）窿', ['屎胐窿', '屎窟窿', '屎忽窿']),
+    ('*猞（射）猁（喱）眼', ['猞猁眼', '猞喱眼', '射猁眼', '射喱眼']),
+    ('*哋1', ['哋']),
+    ('*度（道）1', ['度', '道']),
+    ('喇（嘑）2', ['喇', '嘑']),
+])
+def test_expand_variants(text, forms):
+    assert expand_variants(text) == forms
+
+
+@pytest.mark.parametrize('text, forms', [
+    ('*制1（掣）', ['制', '掣']),
+    ('籮2（腡）', ['籮', '腡']),
+    ('*𦢊1（泡）', ['𦢊', '泡']),
+    ('*拉1（賴）', ['拉', '賴']),
+])
+def test_homograph_number_before_brackets(text, forms):
+    assert expand_variants(text) == forms
+
+
+def test_annotation_is_not_a_variant():
+    assert expand_variants('(𡴀𡴀下面少一橫)') == []
+    assert variant_rows(1, '(𡴀𡴀下面少一橫)') == []
+
+
+def test_variant_rows_fold_keys():
+    assert variant_rows(7, '*制1（掣）') == [[7, 1, '制', '制', True], [7, 2, '掣', '掣', False]]
+    assert variant_rows(8, '阿（亞）誰') == [[8, 1, '阿誰', '阿谁', True], [8, 2, '亞誰', '亚谁', False]]
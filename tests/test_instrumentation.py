@@ -0,0 +1,43 @@
+import tracemalloc
+
+import pytest
+
+from instrumentation import StageMetrics
+
+
+@pytest.fixture
+def tracing():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def test_traced_peak_is_per_stage(tracing):
+    metrics = StageMetrics('test')
+    with metrics.stage('heavy'):
+        data = bytearray(20 * 1024 * 1024)
+        del data
+    with metrics.stage('light'):
+        data = bytearray(1024 * 1024)
+        del data
+    stages = {stage['stage']: stage for stage in metrics.to_dict()['stages']}
+    assert stages['heavy']['peak_traced_mb'] >= 20
+    assert stages['light']['peak_traced_mb'] < 5
+    assert stages['light']['process_peak_rss_mb'] is None or stages['light']['process_peak_rss_mb'] > 0
+
+
+def test_nested_stage_peak_counts_toward_outer(tracing):
+    metrics = StageMetrics('test')
+    with metrics.stage('outer'):
+        with metrics.stage('inner'):
+            data = bytearray(10 * 1024 * 1024)
+            del data
+    assert metrics.stages['outer']['peak_traced_mb'] >= 10
+    assert metrics.stages['inner']['peak_traced_mb'] >= 10
+
+
+def test_no_traced_peak_without_tracemalloc():
+    metrics = StageMetrics('test')
+    with metrics.stage('work', rows=3):
+        pass
+    assert metrics.stages['work']['peak_traced_mb'] is None
@@ -0,0 +1,35 @@
+import json
+import os
+
+import pytest
+
+from sql_parts import SQLPartWriter, load_part_files
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def write_parts(rows, compression=None):
+    writer = SQLPartWriter(lambda batch: 'INSERT INTO t VALUES ' + ', '.join(batch) + ';',
+                           max_rows_per_file=2, compression=compression)
+    writer.write(f'({i})' for i in range(rows))
+    return [part['file'] for part in writer.parts]
+
+
+def test_fewer_parts_remove_stale_files(workdir):
+    assert len(write_parts(6)) == 3
+    files = write_parts(3)
+    assert files == ['expressions_insert_part001.sql', 'expressions_insert_part002.sql']
+    assert sorted(name for name in os.listdir(workdir) if name.endswith('.sql')) == files
+    assert load_part_files() == files
+
+
+def test_changed_compression_removes_previous_parts(workdir):
+    write_parts(3)
+    files = write_parts(3, compression='gzip')
+    assert sorted(name for name in os.listdir(workdir) if name.startswith('expressions_insert_part')) == files
+    with open('expressions_parts_manifest.json', encoding='utf-8') as f:
+        assert json.load(f)['compression'] == 'gzip'
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+主题ID登记表
+theme_registry.json记录每个主题名称对应的ID，由generate_themes_sql.py和generate_expressions_sql.py共用。
+登记表只追加不修改：已有主题的ID永不改变，新主题在末尾分配新ID，
+因此新增分类时只需增量加载新主题及其词条，不必重新生成和加载全部数据。
+登记表同时记录每个主题的层级、父节点和同级排序，变动的主题在增量SQL中以UPDATE更新。
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+REGISTRY_FILE = 'theme_registry.json'
+REGISTRY_VERSION = 1
+
+
+class ThemeRegistry:
+    def __init__(self, path: str = REGISTRY_FILE):
+        self.path = path
+        self.themes = {}  # 存储已登记主题: {name: {id, name, level, parent_id, sort_order}}
+        self.next_id = 1
+        self.new_names = []  # 本次新登记的主题名称（按登记顺序）
+        self.moved_names = []  # 本次层级、父节点或排序有变动的已登记主题
+        self.changed = False
+
+    def load(self) -> 'ThemeRegistry':
+        """读取登记表，文件不存在时视为空表"""
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != REGISTRY_VERSION:
+            raise ValueError(f"不支持的主题登记表版本: {data.get('version')}")
+        for theme in data['themes']:
+            self.themes[theme['name']] = theme
+        self.next_id = max(data.get('next_id', 1), max((t['id'] for t in data['themes']), default=0) + 1)
+        return self
+
+    def save(self) -> None:
+        """写回登记表（按ID排序）"""
+        data = {
+            'version': REGISTRY_VERSION,
+            'next_id': self.next_id,
+            'themes': sorted(self.themes.values(), key=lambda t: t['id']),
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+            f.write('\n')
+        os.replace(tmp_path, self.path)
+        self.changed = False
+
+    def get_id(self, name: str) -> Optional[int]:
+        """查询主题ID，未登记时返回None"""
+        theme = self.themes.get(name)
+        return theme['id'] if theme else None
+
+    def register(self, name: str, level: int, parent_id: Optional[int], sort_order: Optional[int] = None) -> int:
+        """登记主题并返回其ID；已登记的主题保留原ID，只更新层级、父节点和排序
+
+        旧登记表中没有sort_order的主题视为有变动，增量SQL会把排序写入数据库一次
+        """
+        theme = self.themes.get(name)
+        if theme is None:
+            theme = {'id': self.next_id, 'name': name, 'level': level, 'parent_id': parent_id,
+                     'sort_order': sort_order}
+            self.themes[name] = theme
+            self.next_id += 1
+            self.new_names.append(name)
+            self.changed = True
+        elif (theme['level'] != level or theme['parent_id'] != parent_id
+              or (sort_order is not None and theme.get('sort_order') != sort_order)):
+            theme['level'] = level
+            theme['parent_id'] = parent_id
+            if sort_order is not None:
+                theme['sort_order'] = sort_order
+            self.moved_names.append(name)
+            self.changed = True
+        return theme['id']
+
+    def mapping(self) -> Dict[str, int]:
+        """返回{主题名称: ID}映射"""
+        return {name: theme['id'] for name, theme in self.themes.items()}
+
+    def max_id(self) -> int:
+        return self.next_id - 1
+
+
+def load_theme_mapping(path: str = REGISTRY_FILE) -> Dict[str, int]:
+    """读取登记表中的{主题名称: ID}映射"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"找不到主题登记表 {path}，请先运行generate_themes_sql.py")
+    return ThemeRegistry(path).load().mapping()